@@ -0,0 +1,153 @@
+import json
+import os
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from embedding_cache import normalize_query
+from utils.logger import logger
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+
+def game_key(game: str) -> str:
+    """Game names compare without case or punctuation: "Witcher 3: Wild Hunt" == "witcher 3 wild hunt"."""
+    return " ".join(_PUNCTUATION.sub(" ", game.lower()).split())
+
+
+@dataclass
+class CachedAnswer:
+    game: str
+    query: str
+    vector: np.ndarray
+    answer: str
+    stored_at: float
+
+
+class SemanticAnswerCache:
+    """
+    Bounded LRU cache of final game_info answers.
+
+    Entries are keyed by the resolved game name and matched on the cosine similarity
+    of the query embedding, so "who made hades" and "who developed hades?" share one
+    answer. Entries expire after `ttl_seconds`. When `path` is set the cache is loaded
+    from and saved to `<path>.npy` (vectors) plus `<path>.json` (everything else).
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 2000,
+        ttl_seconds: float = 3600,
+        threshold: float = 0.92,
+        path: Optional[str] = None,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.logger = logger
+        self._entries: "OrderedDict[Tuple[str, str], CachedAnswer]" = OrderedDict()
+        self._by_game: Dict[str, Set[Tuple[str, str]]] = {}
+        if path:
+            self.load()
+
+    @staticmethod
+    def _unit(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def get(self, game: str, vector: List[float]) -> Optional[str]:
+        """The cached answer for the most similar query about `game`, if it's close enough."""
+        vector = self._unit(vector)
+        now = time.time()
+        best_key, best_score = None, self.threshold
+        for key in list(self._by_game.get(game_key(game), ())):
+            entry = self._entries[key]
+            if now - entry.stored_at > self.ttl_seconds:
+                self._remove(key)
+                self.expired += 1
+                continue
+            score = float(entry.vector @ vector)
+            if score >= best_score:
+                best_key, best_score = key, score
+        if best_key is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(best_key)
+        self.hits += 1
+        return self._entries[best_key].answer
+
+    def put(self, game: str, query: str, vector: List[float], answer: str):
+        key = (game_key(game), normalize_query(query))
+        self._insert(key, CachedAnswer(key[0], key[1], self._unit(vector), answer, time.time()))
+
+    def _insert(self, key: Tuple[str, str], entry: CachedAnswer):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        self._by_game.setdefault(key[0], set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: Tuple[str, str]):
+        self._entries.pop(key, None)
+        keys = self._by_game.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_game[key[0]]
+
+    def load(self):
+        vectors_path, entries_path = f"{self.path}.npy", f"{self.path}.json"
+        if not (os.path.exists(vectors_path) and os.path.exists(entries_path)):
+            return
+        try:
+            vectors = np.load(vectors_path)
+            with open(entries_path) as f:
+                records = json.load(f)
+            now = time.time()
+            # Saved oldest first, so the most recently used entries survive a smaller limit
+            for record, vector in list(zip(records, vectors))[-self.max_entries:]:
+                if now - record["stored_at"] > self.ttl_seconds:
+                    continue
+                key = (game_key(record["game"]), record["query"])
+                self._insert(key, CachedAnswer(key[0], key[1], vector, record["answer"], record["stored_at"]))
+            self.logger.info(f"Loaded {len(self._entries)} cached answers from {entries_path}")
+        except Exception as e:
+            self.logger.error(f"Error loading answer cache: {e}")
+
+    def save(self):
+        if not self.path or not self._entries:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            entries = list(self._entries.values())
+            np.save(f"{self.path}.npy", np.stack([entry.vector for entry in entries]).astype(np.float32))
+            with open(f"{self.path}.json", "w") as f:
+                json.dump(
+                    [
+                        {"game": e.game, "query": e.query, "answer": e.answer, "stored_at": e.stored_at}
+                        for e in entries
+                    ],
+                    f,
+                )
+        except Exception as e:
+            self.logger.error(f"Error saving answer cache: {e}")
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+    def __len__(self):
+        return len(self._entries)
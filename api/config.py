@@ -0,0 +1,102 @@
+from functools import lru_cache
+from typing import Optional
+
+from dotenv import load_dotenv
+from pydantic_settings import BaseSettings
+
+
+class Settings(BaseSettings):
+    server_script_path: str = "../server/main.py"  # Path to the MCP server script
+    mcp_pool_size: int = 2  # MCP server processes to spread tool calls across
+    mcp_call_timeout_seconds: float = 30.0
+    mcp_health_interval_seconds: float = 15.0
+
+    # Conversation store
+    history_token_budget: int = 3000  # Approx. tokens of history kept per session
+    max_sessions: int = 1000  # Least recently used sessions are dropped beyond this
+    session_ttl_seconds: int = 3600  # Idle sessions expire after this long
+
+    # LLM
+    llm_model: str = "llama3-70b-8192"
+    llm_base_url: Optional[str] = None  # Point at another Groq-compatible endpoint, e.g. the benchmark stand-in
+    llm_max_concurrency: int = 16  # Max Groq completions in flight at once
+    llm_timeout_seconds: float = 60.0  # Per-call timeout
+
+    # Embeddings
+    embedding_model_name: str = "all-MiniLM-L6-v2"
+    embedding_warmup: bool = True  # Run one inference during startup before reporting ready
+    embedding_max_batch_size: int = 32  # Max queries encoded in one forward pass
+    embedding_max_wait_ms: float = 5.0  # How long a batch waits to fill up
+    embedding_cache_size: int = 10000  # Query embeddings kept in the LRU cache
+    embedding_cache_path: Optional[str] = None  # e.g. "cache/embeddings" to persist across restarts
+
+    # Local intent router
+    router_enabled: bool = True
+    router_titles_path: Optional[str] = "data/game_titles.txt"  # One known game title per line
+    router_threshold: float = 0.45  # Min cosine similarity to an action centroid
+    router_margin: float = 0.05  # Min lead over the runner-up action
+
+    # Semantic answer cache for first-turn game_info questions
+    answer_cache_enabled: bool = True
+    answer_cache_size: int = 2000  # Answers kept in memory
+    answer_cache_ttl_seconds: float = 3600
+    answer_cache_threshold: float = 0.92  # Min cosine similarity to a cached query about the same game
+    answer_cache_path: Optional[str] = None  # e.g. "cache/answers" to persist across restarts
+
+    # Prompt packing for game_info answers (tokens are estimated at ~4 characters each)
+    context_window_tokens: int = 8192  # The model's context window
+    rag_candidates: int = 8  # Matches retrieved before scoring and de-duplication
+    context_max_tokens: int = 1800  # IGDB text plus retrieved passages
+    igdb_context_max_tokens: int = 600  # The IGDB text's share of it; the storyline is trimmed first
+    rag_min_score: float = 0.2  # Matches scoring below this are left out
+    rag_duplicate_threshold: float = 0.6  # Word-shingle overlap at which a passage counts as a duplicate
+    rag_mmr_lambda: float = 0.7  # 1.0 ranks by score alone; lower values favour variety
+
+    # Context retrieval deadlines for the game_info and get_docs paths
+    igdb_deadline_seconds: float = 8.0
+    rag_deadline_seconds: float = 5.0
+    docs_deadline_seconds: float = 20.0  # get_docs searches and fetches pages, so it gets longer
+
+    # /query/batch
+    batch_max_items: int = 500
+    batch_igdb_chunk_size: int = 50  # Game names per search_games_batch call (sent to IGDB 10 at a time)
+    batch_igdb_timeout_seconds: float = 60.0
+
+    # Vector index
+    retriever_backend: str = "pinecone"  # "pinecone" or "local"
+    pinecone_index_name: str = "steam-games-index"
+    local_index_path: str = "data/steam-games-index"  # Directory written by LocalRetriever.build
+    local_index_ann: bool = False  # Search only the nearest IVF lists instead of every vector
+    local_index_nprobe: int = 8
+
+    # Tracing: a sample of requests log their IGDB/RAG context, clipped to this many characters
+    trace_log_sample_rate: float = 0.05
+    trace_log_max_chars: int = 500
+
+    # Conversation journal (append-only JSONL)
+    journal_enabled: bool = True
+    journal_dir: str = "conversations"
+    journal_max_bytes: int = 50 * 1024 * 1024  # Rotate once the active file is this big
+    journal_rotate_seconds: float = 86400  # ...or this old
+    journal_fsync: str = "batch"  # "always", "batch" or "never"
+    journal_compress: bool = True  # gzip rotated files
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Read .env and the environment once, on first use rather than at import time."""
+    load_dotenv()
+    return Settings()
+
+
+class _LazySettings:
+    """Stands in for the Settings instance and builds it on first attribute access."""
+
+    def __getattr__(self, name):
+        return getattr(get_settings(), name)
+
+    def __setattr__(self, name, value):
+        setattr(get_settings(), name, value)
+
+
+settings = _LazySettings()
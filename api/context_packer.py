@@ -0,0 +1,174 @@
+import re
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from retriever import Match
+from session_store import estimate_tokens
+
+_WORD = re.compile(r"\w+")
+
+
+def estimate_text_tokens(text: str) -> int:
+    """Rough token count for prompt text (~4 characters per token, like the session store)."""
+    return len(text) // 4
+
+
+def truncate_to_tokens(text: str, tokens: int) -> str:
+    """Cut `text` to about `tokens`, preferring a sentence end, then a word boundary."""
+    limit = tokens * 4
+    if len(text) <= limit:
+        return text
+    cut = text[:limit]
+    sentence_end = max(cut.rfind(". "), cut.rfind("! "), cut.rfind("? "))
+    if sentence_end >= limit // 2:
+        return cut[: sentence_end + 1]
+    space = cut.rfind(" ")
+    return (cut[:space] if space > 0 else cut) + "…"
+
+
+def _shingles(text: str, size: int = 3) -> Set[Tuple[str, ...]]:
+    words = _WORD.findall(text.lower())
+    if len(words) < size:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i : i + size]) for i in range(len(words) - size + 1)}
+
+
+def _similarity(a: Set[Tuple[str, ...]], b: Set[Tuple[str, ...]]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class ContextPacker:
+    """
+    Fits the game_info prompt into a token budget.
+
+    Retrieved passages are picked by maximal marginal relevance: each pick trades the
+    retriever's score against word-shingle overlap with passages already picked, and
+    near-duplicates (editions and re-releases of the same game usually share most of
+    their description) are dropped outright. The IGDB text and the passages share
+    `max_context_tokens`, the IGDB text getting at most `igdb_max_tokens` of it. The
+    conversation history gets what's left of `context_window` after the answer and
+    the context, losing its oldest messages first.
+    """
+
+    def __init__(
+        self,
+        context_window: int = 8192,
+        max_context_tokens: int = 1800,
+        igdb_max_tokens: int = 600,
+        min_score: float = 0.2,
+        duplicate_threshold: float = 0.6,
+        mmr_lambda: float = 0.7,
+        min_passage_tokens: int = 40,
+    ):
+        self.context_window = context_window
+        self.max_context_tokens = max_context_tokens
+        self.igdb_max_tokens = igdb_max_tokens
+        self.min_score = min_score
+        self.duplicate_threshold = duplicate_threshold
+        self.mmr_lambda = mmr_lambda
+        self.min_passage_tokens = min_passage_tokens
+        self.counts = {
+            "packed": 0,
+            "candidates": 0,
+            "kept": 0,
+            "low_score": 0,
+            "duplicates": 0,
+            "truncated": 0,
+            "history_dropped": 0,
+            "tokens_in": 0,
+            "tokens_out": 0,
+        }
+
+    def pack(
+        self,
+        igdb_text: str,
+        matches: Sequence[Match],
+        history: Optional[List[Dict[str, Any]]] = None,
+        reserved_tokens: int = 0,
+    ) -> Tuple[str, List[str], List[Dict[str, Any]]]:
+        """
+        Returns the IGDB text, the passages to include (best first) and the history.
+
+        `reserved_tokens` covers everything that isn't packed here: the answer's
+        max_tokens plus the fixed instructions and the question.
+        """
+        self.counts["packed"] += 1
+        self.counts["tokens_in"] += estimate_text_tokens(igdb_text) + sum(
+            estimate_text_tokens(match.metadata.get("text") or "") for match in matches
+        )
+
+        igdb_budget = min(self.igdb_max_tokens, self.max_context_tokens)
+        if estimate_text_tokens(igdb_text) > igdb_budget:
+            igdb_text = self._shorten_longest_line(igdb_text, igdb_budget)
+            self.counts["truncated"] += 1
+        passages = self.select_passages(matches, self.max_context_tokens - estimate_text_tokens(igdb_text))
+        used = estimate_text_tokens(igdb_text) + sum(estimate_text_tokens(p) for p in passages)
+        self.counts["tokens_out"] += used
+
+        history = self.fit_history(history or [], self.context_window - reserved_tokens - used)
+        return igdb_text, passages, history
+
+    def select_passages(self, matches: Sequence[Match], budget: int) -> List[str]:
+        candidates = []
+        for match in matches:
+            text = (match.metadata.get("text") or "").strip()
+            if not text:
+                continue
+            self.counts["candidates"] += 1
+            if match.score < self.min_score:
+                self.counts["low_score"] += 1
+                continue
+            candidates.append((match.score, text, _shingles(text)))
+
+        picked: List[Tuple[str, Set[Tuple[str, ...]]]] = []
+        while candidates and budget >= self.min_passage_tokens:
+            best_index, best_value, best_overlap = 0, float("-inf"), 0.0
+            for index, (score, _, shingles) in enumerate(candidates):
+                overlap = max((_similarity(shingles, other) for _, other in picked), default=0.0)
+                value = self.mmr_lambda * score - (1 - self.mmr_lambda) * overlap
+                if value > best_value:
+                    best_index, best_value, best_overlap = index, value, overlap
+            _, text, shingles = candidates.pop(best_index)
+            if best_overlap >= self.duplicate_threshold:
+                self.counts["duplicates"] += 1
+                continue
+            if estimate_text_tokens(text) > budget:
+                text = truncate_to_tokens(text, budget)
+                self.counts["truncated"] += 1
+            picked.append((text, shingles))
+            budget -= estimate_text_tokens(text)
+
+        self.counts["kept"] += len(picked)
+        return [text for text, _ in picked]
+
+    def fit_history(self, history: List[Dict[str, Any]], budget: int) -> List[Dict[str, Any]]:
+        """Drop the oldest messages until the rest fit, always keeping the latest one."""
+        history = list(history)
+        total = sum(estimate_tokens(message) for message in history)
+        while total > budget and len(history) > 1:
+            total -= estimate_tokens(history.pop(0))
+            self.counts["history_dropped"] += 1
+        # Same rule as the session store: don't open on an orphaned assistant reply
+        while len(history) > 1 and history[0].get("role") != "user":
+            history.pop(0)
+            self.counts["history_dropped"] += 1
+        return history
+
+    @staticmethod
+    def _shorten_longest_line(text: str, budget: int) -> str:
+        # IGDB text is short labelled lines plus a long storyline; trimming the storyline
+        # keeps the facts (release date, developers, similar games) intact
+        lines = text.split("\n")
+        longest = max(range(len(lines)), key=lambda i: len(lines[i]))
+        excess = estimate_text_tokens(text) - budget
+        keep = max(estimate_text_tokens(lines[longest]) - excess, 0)
+        lines[longest] = truncate_to_tokens(lines[longest], keep)
+        return truncate_to_tokens("\n".join(lines), budget)
+
+    def stats(self):
+        tokens_in = self.counts["tokens_in"]
+        return {
+            **self.counts,
+            "token_reduction": round(1 - self.counts["tokens_out"] / tokens_in, 3) if tokens_in else 0.0,
+        }
@@ -0,0 +1,88 @@
+import json
+import os
+import re
+from collections import OrderedDict
+from typing import List, Optional
+
+import numpy as np
+from utils.logger import logger
+
+
+def normalize_query(text: str) -> str:
+    """Cache key for a query: lowercased, whitespace collapsed, trailing punctuation dropped."""
+    return re.sub(r"\s+", " ", text.lower()).strip(" ?!.")
+
+
+class EmbeddingCache:
+    """
+    Bounded LRU cache of query embeddings keyed by normalized query text.
+
+    When `path` is set the cache is loaded from and saved to `<path>.npy` (a float32
+    matrix of vectors) plus `<path>.keys.json` (the matching keys), so a restarted API
+    keeps its hot set.
+    """
+
+    def __init__(self, max_entries: int = 10000, path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.logger = logger
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        if path:
+            self.load()
+
+    def get(self, text: str) -> Optional[List[float]]:
+        key = normalize_query(text)
+        vector = self._entries.get(key)
+        if vector is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return vector.tolist()
+
+    def put(self, text: str, vector: List[float]):
+        key = normalize_query(text)
+        self._entries[key] = np.asarray(vector, dtype=np.float32)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def load(self):
+        vectors_path, keys_path = f"{self.path}.npy", f"{self.path}.keys.json"
+        if not (os.path.exists(vectors_path) and os.path.exists(keys_path)):
+            return
+        try:
+            vectors = np.load(vectors_path)
+            with open(keys_path) as f:
+                keys = json.load(f)
+            # Saved oldest first, so the most recently used entries survive a smaller limit
+            for key, vector in list(zip(keys, vectors))[-self.max_entries:]:
+                self._entries[key] = vector
+            self.logger.info(f"Loaded {len(self._entries)} cached embeddings from {vectors_path}")
+        except Exception as e:
+            self.logger.error(f"Error loading embedding cache: {e}")
+
+    def save(self):
+        if not self.path or not self._entries:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            np.save(f"{self.path}.npy", np.stack(list(self._entries.values())).astype(np.float32))
+            with open(f"{self.path}.keys.json", "w") as f:
+                json.dump(list(self._entries.keys()), f)
+        except Exception as e:
+            self.logger.error(f"Error saving embedding cache: {e}")
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+    def __len__(self):
+        return len(self._entries)
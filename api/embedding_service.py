@@ -0,0 +1,171 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional
+
+from embedding_cache import EmbeddingCache
+from utils.logger import logger
+
+
+@dataclass
+class EmbeddingMetrics:
+    batches: int = 0
+    items: int = 0
+    max_batch_size: int = 0
+    total_queue_wait: float = 0.0
+    max_queue_wait: float = 0.0
+
+    def record(self, batch_size: int, waits: List[float]):
+        self.batches += 1
+        self.items += batch_size
+        self.max_batch_size = max(self.max_batch_size, batch_size)
+        self.total_queue_wait += sum(waits)
+        self.max_queue_wait = max(self.max_queue_wait, *waits)
+
+    def snapshot(self):
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "avg_queue_wait_ms": round(1000 * self.total_queue_wait / self.items, 3) if self.items else 0.0,
+            "max_queue_wait_ms": round(1000 * self.max_queue_wait, 3),
+        }
+
+
+@dataclass
+class _Request:
+    text: str
+    future: asyncio.Future
+    enqueued_at: float
+
+
+class EmbeddingService:
+    """
+    Micro-batching front end for a SentenceTransformer model.
+
+    Concurrent `encode` calls are queued and gathered into batches of up to
+    `max_batch_size`, waiting at most `max_wait_ms` for a batch to fill. Each batch is
+    encoded on a dedicated worker thread, so inference never runs on the event loop.
+    Queries found in the optional `cache` skip the queue and the model entirely.
+    """
+
+    def __init__(
+        self,
+        model,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        cache: Optional[EmbeddingCache] = None,
+    ):
+        self.model = model
+        self.cache = cache
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.metrics = EmbeddingMetrics()
+        self.logger = logger
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedder")
+
+    def start(self):
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        # Fail anything still waiting instead of leaving callers hanging
+        while self._queue is not None and not self._queue.empty():
+            request = self._queue.get_nowait()
+            if not request.future.done():
+                request.future.set_exception(RuntimeError("Embedding service stopped"))
+        self._executor.shutdown(wait=False)
+        if self.cache is not None:
+            self.cache.save()
+
+    async def encode(self, text: str) -> List[float]:
+        """Embed a single text, sharing a model forward pass with concurrent callers."""
+        if self.cache is not None:
+            cached = self.cache.get(text)
+            if cached is not None:
+                return cached
+
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(_Request(text, future, time.perf_counter()))
+        vector = await future
+        if self.cache is not None:
+            self.cache.put(text, vector)
+        return vector
+
+    async def encode_many(self, texts: List[str]) -> List[List[float]]:
+        """Embed a whole list at once, e.g. for batch requests. Cached and repeated texts are encoded once."""
+        vectors = {}
+        if self.cache is not None:
+            for text in texts:
+                cached = self.cache.get(text)
+                if cached is not None:
+                    vectors[text] = cached
+        missing = [text for text in dict.fromkeys(texts) if text not in vectors]
+        if missing:
+            # Skips the micro-batching queue, so there is no queue wait to record
+            self.metrics.record(len(missing), [0.0])
+            encoded = await asyncio.get_running_loop().run_in_executor(self._executor, self._encode_batch, missing)
+            for text, vector in zip(missing, encoded):
+                vectors[text] = vector.tolist()
+                if self.cache is not None:
+                    self.cache.put(text, vectors[text])
+        return [vectors[text] for text in texts]
+
+    async def _collect_batch(self) -> List[_Request]:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        # Callers that gave up (e.g. request cancelled) don't need a vector
+        return [request for request in batch if not request.future.done()]
+
+    def _encode_batch(self, texts: List[str]):
+        return self.model.encode(texts, batch_size=len(texts), convert_to_numpy=True)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect_batch()
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            self.metrics.record(len(batch), [started - request.enqueued_at for request in batch])
+
+            try:
+                vectors = await loop.run_in_executor(
+                    self._executor, self._encode_batch, [request.text for request in batch]
+                )
+            except Exception as e:
+                self.logger.error(f"Embedding batch of {len(batch)} failed: {e}")
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+                continue
+
+            for request, vector in zip(batch, vectors):
+                if not request.future.done():
+                    request.future.set_result(vector.tolist())
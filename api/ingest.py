@@ -0,0 +1,333 @@
+"""
+Build or refresh the game index from the Steam dataset.
+
+Reads the dataset in chunks (CSV, JSON lines or Parquet), builds the `text` metadata
+field the RAG path reads, embeds new and changed rows in large batches and upserts
+them to Pinecone or the local index. A SQLite state file keeps a content hash per
+row, committed after each chunk is written, so an interrupted run resumes where it
+stopped and a re-run only embeds rows whose text changed. Every title read is also
+written to the intent router's titles file (`router_titles_path`), so game questions
+can be routed without an LLM call.
+
+    python ingest.py data/games.csv --backend local
+    python ingest.py data/games.csv --backend pinecone --processes 4
+"""
+
+import argparse
+import hashlib
+import html
+import json
+import os
+import re
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+from config import settings
+from utils.logger import logger
+
+STATE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rows (
+    id TEXT PRIMARY KEY,
+    hash TEXT NOT NULL,
+    vector BLOB,
+    metadata TEXT
+);
+"""
+
+_TAG = re.compile(r"<[^>]+>")
+
+
+def clean(value: Any) -> str:
+    """Plain text of a dataset cell: HTML stripped, entities decoded, whitespace collapsed."""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return ""
+    return " ".join(html.unescape(_TAG.sub(" ", str(value))).split())
+
+
+def read_chunks(path: str, chunk_rows: int) -> Iterator[List[Dict[str, Any]]]:
+    # Imported here so the API never pays for pandas / pyarrow
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pylist()
+        return
+
+    import pandas as pd
+
+    if path.endswith((".json", ".jsonl")):
+        chunks = pd.read_json(path, lines=True, chunksize=chunk_rows, dtype=False)
+    else:
+        chunks = pd.read_csv(path, chunksize=chunk_rows, dtype=str, keep_default_na=False)
+    for frame in chunks:
+        yield frame.to_dict("records")
+
+
+class Ingestor:
+    """
+    Turns dataset rows into index records and writes the ones that changed.
+
+    `fields` are labelled columns included in the text (genres, developers, ...);
+    `description` is the free-text column appended after them.
+    """
+
+    def __init__(
+        self,
+        state_path: str,
+        backend: str,
+        model_name: str,
+        id_column: str = "AppID",
+        title_column: str = "Name",
+        description_column: str = "About the game",
+        fields: Optional[List[str]] = None,
+        max_chars: int = 2000,
+        batch_size: int = 256,
+        processes: int = 1,
+        upsert_batch_size: int = 100,
+        upsert_workers: int = 8,
+    ):
+        self.backend = backend
+        self.model_name = model_name
+        self.id_column = id_column
+        self.title_column = title_column
+        self.description_column = description_column
+        self.fields = fields if fields is not None else ["Genres", "Tags", "Developers", "Release date"]
+        self.max_chars = max_chars
+        self.batch_size = batch_size
+        self.processes = processes
+        self.upsert_batch_size = upsert_batch_size
+        self.upsert_workers = upsert_workers
+        self.titles: Dict[str, None] = {}
+        self.counts = {"read": 0, "skipped_empty": 0, "unchanged": 0, "embedded": 0, "written": 0}
+        self.logger = logger
+
+        os.makedirs(os.path.dirname(state_path) or ".", exist_ok=True)
+        self.state = sqlite3.connect(state_path)
+        self.state.execute("PRAGMA journal_mode=WAL")
+        self.state.executescript(STATE_SCHEMA)
+
+        self.model = None
+        self._pool = None
+        self.index = None
+        self._executor = ThreadPoolExecutor(max_workers=upsert_workers, thread_name_prefix="upsert")
+
+    def _load_model(self):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(self.model_name)
+        if self.processes > 1:
+            self._pool = self.model.start_multi_process_pool(target_devices=["cpu"] * self.processes)
+
+    def _connect_pinecone(self):
+        from pinecone import Pinecone
+
+        self.index = Pinecone(api_key=os.getenv("PINECONE_API_KEY")).Index(settings.pinecone_index_name)
+
+    def to_record(self, row: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        row_id = clean(row.get(self.id_column))
+        title = clean(row.get(self.title_column))
+        if not row_id or not title:
+            return None
+        parts = [f"{title}."]
+        for field in self.fields:
+            value = clean(row.get(field))
+            if value:
+                parts.append(f"{field}: {value}.")
+        description = clean(row.get(self.description_column))
+        if description:
+            parts.append(description)
+        text = " ".join(parts)[: self.max_chars]
+        return {"id": row_id, "metadata": {"title": title, "text": text}}
+
+    def content_hash(self, record: Dict[str, Any]) -> str:
+        # The model is part of the hash so switching models re-embeds everything
+        payload = json.dumps([self.model_name, record["metadata"]], sort_keys=True)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def changed(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        hashes = {record["id"]: self.content_hash(record) for record in records}
+        known = {}
+        ids = list(hashes)
+        for start in range(0, len(ids), 500):
+            batch = ids[start : start + 500]
+            known.update(
+                self.state.execute(
+                    f"SELECT id, hash FROM rows WHERE id IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+            )
+        fresh = []
+        for record in records:
+            record["hash"] = hashes[record["id"]]
+            if known.get(record["id"]) != record["hash"]:
+                fresh.append(record)
+        return fresh
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        if self.model is None:
+            self._load_model()
+        if self._pool is not None:
+            return self.model.encode_multi_process(texts, self._pool, batch_size=self.batch_size)
+        return self.model.encode(texts, batch_size=self.batch_size, convert_to_numpy=True)
+
+    def write(self, records: List[Dict[str, Any]], vectors: np.ndarray) -> List:
+        """Start writing a chunk; returns futures to wait on before checkpointing it."""
+        if self.backend == "local":
+            # The state file holds the vectors; the index directory is rebuilt from it at the end
+            return []
+        if self.index is None:
+            self._connect_pinecone()
+        items = [
+            (record["id"], vector.tolist(), record["metadata"]) for record, vector in zip(records, vectors)
+        ]
+        return [
+            self._executor.submit(self.index.upsert, vectors=items[start : start + self.upsert_batch_size])
+            for start in range(0, len(items), self.upsert_batch_size)
+        ]
+
+    def checkpoint(self, records: List[Dict[str, Any]], vectors: np.ndarray):
+        keep_vectors = self.backend == "local"
+        with self.state:
+            self.state.executemany(
+                "INSERT OR REPLACE INTO rows VALUES (?, ?, ?, ?)",
+                [
+                    (
+                        record["id"],
+                        record["hash"],
+                        np.asarray(vector, dtype=np.float32).tobytes() if keep_vectors else None,
+                        json.dumps(record["metadata"]) if keep_vectors else None,
+                    )
+                    for record, vector in zip(records, vectors)
+                ],
+            )
+
+    def run(self, path: str, chunk_rows: int = 5000, titles_path: Optional[str] = None):
+        started = time.perf_counter()
+        pending = None
+        for chunk_number, rows in enumerate(read_chunks(path, chunk_rows)):
+            self.counts["read"] += len(rows)
+            records = {}
+            for row in rows:
+                record = self.to_record(row)
+                if record is None:
+                    self.counts["skipped_empty"] += 1
+                else:
+                    # Later duplicates of an id win, as they would in the index
+                    records[record["id"]] = record
+                    self.titles[record["metadata"]["title"]] = None
+            fresh = self.changed(list(records.values()))
+            self.counts["unchanged"] += len(records) - len(fresh)
+            if not fresh:
+                continue
+
+            vectors = self.encode([record["metadata"]["text"] for record in fresh])
+            self.counts["embedded"] += len(fresh)
+            # Encoding of this chunk overlapped with the previous chunk's upserts; finish those first
+            self._finish(pending)
+            pending = (self.write(fresh, vectors), fresh, vectors)
+            self.logger.info(
+                f"Chunk {chunk_number}: {len(fresh)} of {len(rows)} rows new or changed "
+                f"({self.counts['read'] / (time.perf_counter() - started):.0f} rows/s)"
+            )
+        self._finish(pending)
+
+        if self.backend == "local" and (self.counts["written"] or not os.path.exists(settings.local_index_path)):
+            self.build_local_index()
+        if titles_path:
+            self.write_titles(titles_path)
+        self.logger.info(f"Ingestion finished in {time.perf_counter() - started:.1f}s: {self.counts}")
+
+    def _finish(self, pending):
+        if pending is None:
+            return
+        futures, records, vectors = pending
+        wait(futures)
+        for future in futures:
+            # Re-raises the first failed upsert; its chunk stays un-checkpointed and is retried next run
+            future.result()
+        self.checkpoint(records, vectors)
+        self.counts["written"] += len(records)
+
+    def write_titles(self, path: str):
+        """Write every title read this run, one per line, for IntentRouter."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # Written next to the target and renamed, so a running API never reads half a file
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            for title in self.titles:
+                f.write(f"{title}\n")
+        os.replace(f"{path}.tmp", path)
+        self.logger.info(f"Wrote {len(self.titles)} game titles to {path}")
+
+    def build_local_index(self, path: Optional[str] = None, n_lists: Optional[int] = None):
+        path = path or settings.local_index_path
+        ids, vectors, records = [], [], []
+        for row_id, blob, metadata in self.state.execute(
+            "SELECT id, vector, metadata FROM rows WHERE vector IS NOT NULL ORDER BY id"
+        ):
+            ids.append(row_id)
+            vectors.append(np.frombuffer(blob, dtype=np.float32))
+            records.append({"id": row_id, "metadata": json.loads(metadata)})
+        if not records:
+            self.logger.warning("No rows to write to the local index")
+            return
+        from retriever import LocalRetriever
+
+        # IVF lists are only worth it for larger corpora
+        n_lists = n_lists if n_lists is not None else (int(len(records) ** 0.5) if len(records) >= 10000 else 0)
+        LocalRetriever.build(path, np.stack(vectors), records, n_lists=n_lists)
+        self.logger.info(f"Wrote {len(records)} vectors to {path}")
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        if self._pool is not None:
+            self.model.stop_multi_process_pool(self._pool)
+        self.state.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("dataset", help="CSV, JSON lines or Parquet file")
+    parser.add_argument("--backend", choices=["pinecone", "local"], default=settings.retriever_backend)
+    parser.add_argument("--state", help="Checkpoint / content-hash file (default: data/ingest-<backend>.sqlite3)")
+    parser.add_argument("--model", default=settings.embedding_model_name)
+    parser.add_argument("--chunk-rows", type=int, default=5000, help="Rows read per chunk")
+    parser.add_argument("--batch-size", type=int, default=256, help="Texts per encoder batch")
+    parser.add_argument("--processes", type=int, default=1, help="Encoder processes")
+    parser.add_argument("--upsert-batch-size", type=int, default=100)
+    parser.add_argument("--upsert-workers", type=int, default=8)
+    parser.add_argument("--id-column", default="AppID")
+    parser.add_argument("--title-column", default="Name")
+    parser.add_argument("--description-column", default="About the game")
+    parser.add_argument("--fields", default="Genres,Tags,Developers,Release date", help="Comma-separated")
+    parser.add_argument(
+        "--titles",
+        default=settings.router_titles_path or "",
+        help="Where to write the intent router's game titles ('' to skip; default: router_titles_path)",
+    )
+    parser.add_argument("--max-chars", type=int, default=2000, help="Cap on the text stored per game")
+    args = parser.parse_args()
+
+    ingestor = Ingestor(
+        args.state or f"data/ingest-{args.backend}.sqlite3",
+        args.backend,
+        args.model,
+        id_column=args.id_column,
+        title_column=args.title_column,
+        description_column=args.description_column,
+        fields=[field.strip() for field in args.fields.split(",") if field.strip()],
+        max_chars=args.max_chars,
+        batch_size=args.batch_size,
+        processes=args.processes,
+        upsert_batch_size=args.upsert_batch_size,
+        upsert_workers=args.upsert_workers,
+    )
+    try:
+        ingestor.run(args.dataset, chunk_rows=args.chunk_rows, titles_path=args.titles or None)
+    finally:
+        ingestor.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+import asyncio
+import difflib
+import math
+import os
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+from embedding_service import EmbeddingService
+from utils.logger import logger
+
+# Labelled example queries; each action's centroid is the mean of its embeddings
+ROUTE_EXAMPLES: Dict[str, List[str]] = {
+    "game_info": [
+        "Tell me about God of War",
+        "elden ring",
+        "What is The Witcher 3 about?",
+        "Who developed Hollow Knight?",
+        "When was Red Dead Redemption 2 released?",
+        "Is Stardew Valley a good game?",
+        "What genre is Hades?",
+        "Games similar to Dark Souls",
+        "What's the story of The Last of Us?",
+        "Rating of Cyberpunk 2077",
+        "Give me info on Minecraft",
+        "Which studio made Celeste?",
+    ],
+    "get_docs": [
+        "How do I use Chroma DB with langchain?",
+        "openai streaming API example",
+        "llama-index vector store setup",
+        "How to call function tools with the OpenAI SDK",
+        "langchain retriever documentation",
+        "How do I create an index in LlamaIndex?",
+        "OpenAI embeddings API parameters",
+        "langchain agents tutorial",
+        "python code to stream chat completions",
+        "library docs for prompt templates",
+    ],
+    "general": [
+        "Hi there!",
+        "How are you?",
+        "What's the capital of France?",
+        "Tell me a joke",
+        "What can you do?",
+        "Thanks, that's all",
+        "Explain quantum computing simply",
+        "What's the weather like today?",
+        "Who are you?",
+        "Write a short poem about the sea",
+    ],
+}
+
+LIBRARY_ALIASES = {
+    "langchain": "langchain",
+    "llama-index": "llama-index",
+    "llama index": "llama-index",
+    "llamaindex": "llama-index",
+    "openai": "openai",
+}
+
+
+# Words that are also one-word game titles ("And", "This", ...) but say nothing about a game
+STOPWORDS = {
+    "a", "about", "after", "all", "an", "and", "any", "are", "as", "at", "be", "best", "but", "by", "can",
+    "did", "do", "does", "for", "from", "game", "games", "get", "good", "has", "have", "how", "i", "in",
+    "is", "it", "its", "like", "made", "me", "more", "my", "new", "not", "of", "on", "or", "out", "play",
+    "should", "so", "some", "tell", "that", "the", "this", "to", "up", "was", "what", "when", "where",
+    "which", "who", "why", "will", "with", "worth", "you", "your",
+}
+# A lone word only counts as a title at this length, so "Ico" or "Rez" go to the LLM instead
+MIN_SINGLE_WORD_TITLE = 4
+# difflib ratio for fuzzy title matches; it also bounds how different the lengths can be
+TITLE_CUTOFF = 0.88
+
+
+def _normalize(text: str) -> str:
+    return " ".join(re.sub(r"[^\w\s'-]", " ", text.lower()).split())
+
+
+@dataclass
+class Route:
+    action: str
+    score: float
+    confident: bool
+    game_name: Optional[str] = None
+    library: Optional[str] = None
+
+    def as_action(self, query: str) -> dict:
+        """The same shape as the LLM classifier's JSON output."""
+        parsed = {"action": self.action}
+        if self.action == "game_info":
+            parsed["game_name"] = self.game_name or query
+        elif self.action == "get_docs":
+            parsed["query"] = query
+            parsed["library"] = self.library
+        return parsed
+
+
+class IntentRouter:
+    """
+    Local nearest-centroid router in front of the LLM classifier.
+
+    Queries are embedded with the shared MiniLM model and compared against one
+    centroid per action. A route is only trusted when the best score clears
+    `threshold`, beats the runner-up by `margin`, and (for game_info / get_docs) a
+    known game title or supported library can be pulled out of the query.
+    Everything else falls back to the LLM.
+    """
+
+    def __init__(
+        self,
+        embeddings: EmbeddingService,
+        titles_path: Optional[str] = None,
+        threshold: float = 0.45,
+        margin: float = 0.05,
+        examples: Dict[str, List[str]] = ROUTE_EXAMPLES,
+    ):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.margin = margin
+        self.examples = examples
+        self.actions: List[str] = []
+        self.centroids: Optional[np.ndarray] = None
+        self.routed = defaultdict(int)
+        self.fallbacks = 0
+        self.logger = logger
+
+        # Known titles, bucketed by first two letters and length so a fuzzy match only
+        # compares against titles that could clear TITLE_CUTOFF
+        self.titles: Dict[str, str] = {}
+        self._title_buckets: Dict[tuple, List[str]] = defaultdict(list)
+        if titles_path and os.path.exists(titles_path):
+            with open(titles_path) as f:
+                for line in f:
+                    if line.strip():
+                        self.add_title(line.strip())
+            self.logger.info(f"Loaded {len(self.titles)} game titles for routing")
+
+    def add_title(self, title: str):
+        key = _normalize(title)
+        if key and key not in self.titles:
+            self.titles[key] = title
+            self._title_buckets[(key[:2], len(key))].append(key)
+
+    def fit(self, model):
+        """Compute action centroids. Runs once, on the thread that loaded the model."""
+        self.actions = list(self.examples)
+        centroids = []
+        for action in self.actions:
+            vectors = model.encode(self.examples[action], normalize_embeddings=True)
+            centroid = vectors.mean(axis=0)
+            centroids.append(centroid / np.linalg.norm(centroid))
+        self.centroids = np.stack(centroids).astype(np.float32)
+
+    @property
+    def ready(self) -> bool:
+        return self.centroids is not None
+
+    def extract_title(self, query: str) -> Optional[str]:
+        """
+        Longest run of query words that (fuzzily) matches a known title. CPU-bound on a
+        large title list, so `route` runs it off the event loop.
+        """
+        if not self.titles:
+            return None
+        words = _normalize(query).split()
+        for size in range(min(len(words), 8), 0, -1):
+            for start in range(len(words) - size + 1):
+                candidate = " ".join(words[start : start + size])
+                if size == 1 and (len(candidate) < MIN_SINGLE_WORD_TITLE or candidate in STOPWORDS):
+                    continue
+                if candidate in self.titles:
+                    return self.titles[candidate]
+                if size > 1:
+                    bucket = self._similar_length(candidate)
+                    close = difflib.get_close_matches(candidate, bucket, n=1, cutoff=TITLE_CUTOFF)
+                    if close:
+                        return self.titles[close[0]]
+        return None
+
+    def _similar_length(self, candidate: str) -> List[str]:
+        # ratio = 2 * matches / (len(a) + len(b)) can only reach the cutoff when the
+        # shorter string is at least cutoff / (2 - cutoff) of the longer one
+        bound = TITLE_CUTOFF / (2 - TITLE_CUTOFF)
+        length = len(candidate)
+        keys: List[str] = []
+        for other in range(math.ceil(length * bound), math.floor(length / bound) + 1):
+            keys.extend(self._title_buckets.get((candidate[:2], other), ()))
+        return keys
+
+    def extract_library(self, query: str) -> Optional[str]:
+        text = query.lower()
+        for alias, library in LIBRARY_ALIASES.items():
+            if alias in text:
+                return library
+        return None
+
+    async def route(self, query: str) -> Optional[Route]:
+        """Classify locally; returns None until the model is loaded."""
+        if not self.ready:
+            return None
+
+        vector = np.asarray(await self.embeddings.encode(query), dtype=np.float32)
+        scores = self.centroids @ (vector / (np.linalg.norm(vector) or 1.0))
+        order = np.argsort(scores)[::-1]
+        best = float(scores[order[0]])
+        runner_up = float(scores[order[1]]) if len(order) > 1 else 0.0
+
+        route = Route(self.actions[order[0]], best, best >= self.threshold and best - runner_up >= self.margin)
+        if route.action == "game_info":
+            route.game_name = await asyncio.to_thread(self.extract_title, query) if self.titles else None
+            route.confident = route.confident and route.game_name is not None
+        elif route.action == "get_docs":
+            route.library = self.extract_library(query)
+            route.confident = route.confident and route.library is not None
+
+        if route.confident:
+            self.routed[route.action] += 1
+        else:
+            self.fallbacks += 1
+        return route
+
+    def stats(self):
+        total = sum(self.routed.values()) + self.fallbacks
+        return {
+            "routed": dict(self.routed),
+            "llm_fallbacks": self.fallbacks,
+            "fallback_rate": round(self.fallbacks / total, 3) if total else 0.0,
+            "known_titles": len(self.titles),
+        }
@@ -0,0 +1,176 @@
+import asyncio
+import gzip
+import json
+import os
+import shutil
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from utils.logger import logger
+
+
+def serialize_message(message: Dict[str, Any]) -> Dict[str, Any]:
+    """Turn a chat message (possibly holding pydantic objects) into plain JSON data."""
+    serializable_message = {"role": message["role"], "content": []}
+    content = message["content"]
+
+    # If content is just a string (e.g. user input or assistant reply)
+    if isinstance(content, str):
+        serializable_message["content"] = content
+
+    # If content is a list (like tool results)
+    elif isinstance(content, list):
+        for item in content:
+            if hasattr(item, "model_dump"):
+                serializable_message["content"].append(item.model_dump())
+            else:
+                serializable_message["content"].append(item)
+
+    # If content is a Pydantic object like `ChatCompletionMessage`
+    elif hasattr(content, "model_dump"):
+        serializable_message["content"] = content.model_dump()
+
+    else:
+        serializable_message["content"] = content  # fallback
+
+    return serializable_message
+
+
+class ConversationJournal:
+    """
+    Append-only JSONL journal of conversation messages, one record per message.
+
+    `record` only enqueues, so journaling never blocks a request. A background task
+    writes queued records in batches on a worker thread. `fsync` is "always" (after
+    every record), "batch" (after every batch) or "never" (leave it to the OS). The
+    active file is rotated once it passes `max_bytes` or `rotate_seconds`, and rotated
+    files are gzip-compressed.
+    """
+
+    def __init__(
+        self,
+        directory: str = "conversations",
+        max_bytes: int = 50 * 1024 * 1024,
+        rotate_seconds: float = 86400,
+        fsync: str = "batch",
+        batch_size: int = 256,
+        flush_interval: float = 1.0,
+        compress: bool = True,
+        max_queue: int = 10000,
+    ):
+        if fsync not in ("always", "batch", "never"):
+            raise ValueError(f"Unknown fsync policy: {fsync}")
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.rotate_seconds = rotate_seconds
+        self.fsync = fsync
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.compress = compress
+        self.max_queue = max_queue
+        self.written = 0
+        self.dropped = 0
+        self.logger = logger
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+        self._file = None
+        self._file_path: Optional[str] = None
+        self._opened_at = 0.0
+        self._sequence = 0
+
+    def record(self, session_id: str, message: Dict[str, Any]):
+        """Queue one message for the journal."""
+        if self._writer is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._writer = asyncio.create_task(self._run())
+        entry = {
+            "session_id": session_id,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            **serialize_message(message),
+        }
+        try:
+            self._queue.put_nowait(json.dumps(entry, default=str))
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            first = await self._queue.get()
+            if first is None:
+                break
+            batch = [first]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    line = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                if line is None:
+                    stopping = True
+                    break
+                batch.append(line)
+            try:
+                await asyncio.to_thread(self._write_batch, batch)
+            except Exception as e:
+                self.logger.error(f"Error writing conversation journal: {e}")
+
+    def _write_batch(self, lines: List[str]):
+        if self._file is None or self._should_rotate():
+            self._rotate()
+        for line in lines:
+            self._file.write(line + "\n")
+            if self.fsync == "always":
+                self._file.flush()
+                os.fsync(self._file.fileno())
+        self._file.flush()
+        if self.fsync == "batch":
+            os.fsync(self._file.fileno())
+        self.written += len(lines)
+
+    def _should_rotate(self) -> bool:
+        return (
+            self._file.tell() >= self.max_bytes
+            or time.monotonic() - self._opened_at >= self.rotate_seconds
+        )
+
+    def _rotate(self):
+        if self._file is not None:
+            self._file.close()
+            if self.compress:
+                with open(self._file_path, "rb") as src, gzip.open(self._file_path + ".gz", "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+                os.remove(self._file_path)
+
+        os.makedirs(self.directory, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        self._sequence += 1
+        self._file_path = os.path.join(
+            self.directory, f"journal_{timestamp}_{os.getpid()}_{self._sequence}.jsonl"
+        )
+        self._file = open(self._file_path, "a", encoding="utf-8")
+        self._opened_at = time.monotonic()
+
+    async def close(self):
+        """Write out whatever is still queued, then close the file."""
+        if self._writer is None:
+            return
+        # The sentinel lands behind every queued record, so the writer drains them first
+        await self._queue.put(None)
+        await self._writer
+        self._writer = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def stats(self):
+        return {
+            "written": self.written,
+            "dropped": self.dropped,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+        }
@@ -0,0 +1,91 @@
+import asyncio
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from groq import AsyncGroq
+from utils.logger import logger
+
+
+class LLMClient:
+    """
+    Non-blocking wrapper around the Groq chat completions API.
+
+    Calls run on the async Groq client so they never block the event loop. A semaphore
+    caps how many completions are in flight at once, and each call gets its own timeout.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model: str = "llama3-70b-8192",
+        max_concurrency: int = 16,
+        timeout: float = 60.0,
+        base_url: Optional[str] = None,
+    ):
+        self.model = model
+        self.timeout = timeout
+        self.client = AsyncGroq(api_key=api_key, base_url=base_url, timeout=timeout)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.logger = logger
+
+    async def chat(
+        self,
+        messages: List[Dict[str, Any]],
+        max_tokens: int,
+        timeout: Optional[float] = None,
+        **kwargs,
+    ):
+        """Create a chat completion, waiting for a free slot if the cap is reached."""
+        async with self._semaphore:
+            try:
+                return await asyncio.wait_for(
+                    self.client.chat.completions.create(
+                        model=kwargs.pop("model", self.model),
+                        messages=messages,
+                        max_tokens=max_tokens,
+                        **kwargs,
+                    ),
+                    timeout=timeout or self.timeout,
+                )
+            except asyncio.TimeoutError:
+                self.logger.error(f"LLM call timed out after {timeout or self.timeout}s")
+                raise
+
+    async def stream(
+        self,
+        messages: List[Dict[str, Any]],
+        max_tokens: int,
+        timeout: Optional[float] = None,
+        **kwargs,
+    ) -> AsyncIterator[str]:
+        """Stream a chat completion's text as it's generated. `timeout` applies per chunk."""
+        timeout = timeout or self.timeout
+        async with self._semaphore:
+            stream = await asyncio.wait_for(
+                self.client.chat.completions.create(
+                    model=kwargs.pop("model", self.model),
+                    messages=messages,
+                    max_tokens=max_tokens,
+                    stream=True,
+                    **kwargs,
+                ),
+                timeout=timeout,
+            )
+            chunks = stream.__aiter__()
+            try:
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), timeout=timeout)
+                    except StopAsyncIteration:
+                        break
+                    except asyncio.TimeoutError:
+                        self.logger.error(f"LLM stream stalled for more than {timeout}s")
+                        raise
+                    content = chunk.choices[0].delta.content if chunk.choices else None
+                    if content:
+                        yield content
+            finally:
+                # Release the HTTP connection even if the consumer stops early
+                await stream.close()
+
+    async def close(self):
+        await self.client.close()
@@ -1,26 +1,23 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 from contextlib import asynccontextmanager
+import json
 from mcp_client import MCPClient
-from dotenv import load_dotenv
-from pydantic_settings import BaseSettings
+from config import settings
+from metrics import Trace
 
-load_dotenv()
-
-
-class Settings(BaseSettings):
-    server_script_path: str = "../server/main.py"  # Path to the MCP server script
-
-
-settings = Settings()
 print(f"Launching MCP server from: {settings.server_script_path}")
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     client = MCPClient()
+    # Model load and Pinecone setup overlap with spawning the MCP server below;
+    # /ready stays false until all of them are done.
+    client.start_background_init()
     try:
         connected = await client.connect_to_server(settings.server_script_path)
         if not connected:
@@ -52,6 +49,20 @@ app.add_middleware(
 
 class QueryRequest(BaseModel):
     query: str
+    session_id: str = "default"
+
+
+class BatchItem(BaseModel):
+    game_name: str
+    query: Optional[str] = None  # Defaults to "Tell me about <game_name>"
+
+
+class BatchQueryRequest(BaseModel):
+    items: List[BatchItem]
+
+
+class ResetRequest(BaseModel):
+    session_id: str = "default"
 
 
 class Message(BaseModel):
@@ -65,29 +76,113 @@ class ToolCall(BaseModel):
 
 
 @app.post("/query")
-async def process_query(request: QueryRequest):
-    """Process a query and return the response"""
+async def process_query(request: QueryRequest, response: Response):
+    """Process a query and return the response, with per-stage Server-Timing"""
     try:
-        messages = await app.state.client.process_query(request.query)
+        trace = Trace(app.state.client.metrics)
+        messages = await app.state.client.process_query(
+            request.query, session_id=request.session_id, trace=trace
+        )
+        response.headers["Server-Timing"] = trace.server_timing()
+        response.headers["X-Trace-Id"] = trace.trace_id
         return {"messages": messages}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/query/stream")
+async def process_query_stream(request: QueryRequest):
+    """Process a query, streaming stage updates and answer tokens as NDJSON"""
+
+    # Headers go out before the stages run, so streams only get the trace id
+    trace = Trace(app.state.client.metrics)
+
+    async def events():
+        async for event in app.state.client.process_query_stream(
+            request.query, session_id=request.session_id, trace=trace
+        ):
+            yield json.dumps(event, default=str) + "\n"
+
+    return StreamingResponse(
+        events(), media_type="application/x-ndjson", headers={"X-Trace-Id": trace.trace_id}
+    )
+
+
+@app.post("/query/batch")
+async def process_query_batch(request: BatchQueryRequest):
+    """Answer many game questions at once, streaming each result as NDJSON when it's ready"""
+    if not request.items:
+        raise HTTPException(status_code=400, detail="A batch needs at least one item")
+    if len(request.items) > settings.batch_max_items:
+        raise HTTPException(
+            status_code=400, detail=f"At most {settings.batch_max_items} items per batch"
+        )
+    items = [
+        {"game_name": item.game_name, "query": item.query or f"Tell me about {item.game_name}"}
+        for item in request.items
+    ]
+
+    async def events():
+        async for event in app.state.client.process_batch(items):
+            yield json.dumps(event, default=str) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
 @app.post("/reset")
-async def reset_conversation():
-    """Reset the backend message history"""
+async def reset_conversation(request: Optional[ResetRequest] = None):
+    """Reset the backend message history for a session"""
     try:
-        app.state.client.messages = []
+        request = request or ResetRequest()
+        app.state.client.reset_session(request.session_id)
         return {"status": "cleared"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Reset failed: {str(e)}")
 
 
+@app.get("/health")
+async def health(response: Response):
+    """Liveness: the process is up and startup hasn't failed"""
+    client = getattr(app.state, "client", None)
+    if client is not None and client.init_failed:
+        response.status_code = 503
+        return {"status": "failed"}
+    return {"status": "ok"}
+
+
+@app.get("/ready")
+async def ready(response: Response):
+    """Readiness: the MCP server, embedding model and vector index are all loaded"""
+    client = getattr(app.state, "client", None)
+    if client is None or not client.ready:
+        response.status_code = 503
+        return {"status": "loading"}
+    return {"status": "ready"}
+
+
+@app.get("/stats")
+async def get_stats():
+    """Get runtime counters for the client's caches and queues"""
+    return app.state.client.stats()
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus histograms for query stages and MCP tool spans"""
+    return PlainTextResponse(
+        await app.state.client.render_metrics(), media_type="text/plain; version=0.0.4"
+    )
+
+
 @app.get("/tools")
-async def get_tools():
-    """Get the list of available tools"""
+async def get_tools(request: Request, response: Response):
+    """Get the list of available tools (supports If-None-Match)"""
     try:
         tools = await app.state.client.get_mcp_tools()
+        etag = app.state.client.tools_etag
+        if etag and request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        if etag:
+            response.headers["ETag"] = etag
         return {
             "tools": [
                 {
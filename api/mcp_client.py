@@ -1,42 +1,227 @@
-from typing import Optional
+from typing import Dict, List, Optional
 from contextlib import AsyncExitStack
+import asyncio
+import hashlib
 import traceback
 
 # from utils.logger import logger
-from mcp import ClientSession, StdioServerParameters
-from mcp.client.stdio import stdio_client
-from datetime import datetime
+from mcp import StdioServerParameters
+import mcp.types as types
 from utils.logger import logger
 import json
 import os
-from sentence_transformers import SentenceTransformer
-from pinecone import Pinecone
+import time
+from functools import lru_cache
 from urllib.parse import unquote
-import os
-from groq import Groq
 from dotenv import dotenv_values
+from answer_cache import SemanticAnswerCache
+from config import settings
+from context_packer import ContextPacker, estimate_text_tokens
+from embedding_cache import EmbeddingCache, normalize_query
+from embedding_service import EmbeddingService
+from intent_router import LIBRARY_ALIASES, IntentRouter
+from journal import ConversationJournal
+from llm import LLMClient
+from mcp_pool import MCPSessionPool
+from metrics import StageMetrics, Trace
+from retriever import LocalRetriever, PineconeRetriever, Retriever
+from session_store import ConversationStore
+
+
+@lru_cache(maxsize=1)
+def load_env():
+    """Read .env once, on first use rather than at import time."""
+    env_vars = dotenv_values(".env")
+    full_env = os.environ.copy()
+    full_env.update(env_vars)
+    return env_vars, full_env
+
+
+# What a context branch degrades to when it fails or misses its deadline
+IGDB_PLACEHOLDER = "No IGDB info found."
+RAG_PLACEHOLDER = "No additional info."
+DOCS_PLACEHOLDER = "No documentation found."
+
+
+def _game_info_prompt(igdb_text: str, rag_context: str, query: str) -> List[dict]:
+    return [
+        {
+            "role": "system",
+            "content": "Use the info below to answer user's game question. Combine both IGDB and game database context.",
+        },
+        {"role": "user", "content": f"IGDB Info:\n{igdb_text}\n\nOther Context:\n{rag_context}\n\nQuestion: {query}"},
+    ]
+
+
+def _docs_prompt(docs_text: str, library: Optional[str], query: str) -> List[dict]:
+    return [
+        {
+            "role": "system",
+            "content": "Answer the user's coding question using the documentation excerpts below. "
+            "Say so if they don't cover it.",
+        },
+        {"role": "user", "content": f"{library or 'Library'} docs:\n{docs_text}\n\nQuestion: {query}"},
+    ]
+
+
+def _pack_prompt(
+    packer: ContextPacker, igdb_text: str, matches, query: str, history: List[dict], max_tokens: int
+):
+    """
+    The game_info prompt with its context fitted to the token budget. Returns the
+    messages and the packed RAG context (RAG_PLACEHOLDER when no passage made it).
+    """
+    reserved = max_tokens + estimate_text_tokens(json.dumps(_game_info_prompt("", "", query)))
+    igdb_text, passages, history = packer.pack(igdb_text, matches, history, reserved)
+    rag_context = "\n\n".join(passages) or RAG_PLACEHOLDER
+    return history + _game_info_prompt(igdb_text, rag_context, query), rag_context
 
-# Init clients
-env_vars = dotenv_values(".env")
-full_env = os.environ.copy()
-full_env.update(env_vars)
-embedder = SentenceTransformer("all-MiniLM-L6-v2")
-pinecone = Pinecone(api_key=env_vars.get("PINECONE_API_KEY"))
-index = pinecone.Index("steam-games-index")
-groq_client = Groq(api_key=env_vars.get("GROQ_API_KEY"))
 
+def _clip(text: str) -> str:
+    """Bound how much of a tool result or retrieved context goes into the logs."""
+    limit = settings.trace_log_max_chars
+    return text if len(text) <= limit else f"{text[:limit]}... ({len(text)} chars)"
 
 
 class MCPClient:
     def __init__(self):
+        env_vars, _ = load_env()
         # Initialize session and client objects
-        self.session: Optional[ClientSession] = None
+        self.pool: Optional[MCPSessionPool] = None
         self.exit_stack = AsyncExitStack()
-        self.llm = Groq()
+        # Loaded in the background by start_background_init()
+        self.retriever: Optional[Retriever] = None
+        self._init_task: Optional[asyncio.Task] = None
+        self.llm = LLMClient(
+            api_key=env_vars.get("GROQ_API_KEY"),
+            model=settings.llm_model,
+            max_concurrency=settings.llm_max_concurrency,
+            timeout=settings.llm_timeout_seconds,
+            base_url=settings.llm_base_url,
+        )
+        self.embeddings = EmbeddingService(
+            None,
+            max_batch_size=settings.embedding_max_batch_size,
+            max_wait_ms=settings.embedding_max_wait_ms,
+            cache=EmbeddingCache(
+                max_entries=settings.embedding_cache_size,
+                path=settings.embedding_cache_path,
+            ),
+        )
+        self.router = IntentRouter(
+            self.embeddings,
+            titles_path=settings.router_titles_path,
+            threshold=settings.router_threshold,
+            margin=settings.router_margin,
+        )
         self.tools = []
-        self.messages = []
+        # MCP tool list, cached until the server says it changed
+        self._tool_catalog = None
+        self.tools_etag: Optional[str] = None
+        self.conversations = ConversationStore(
+            token_budget=settings.history_token_budget,
+            max_sessions=settings.max_sessions,
+            ttl_seconds=settings.session_ttl_seconds,
+        )
+        self.journal = (
+            ConversationJournal(
+                directory=settings.journal_dir,
+                max_bytes=settings.journal_max_bytes,
+                rotate_seconds=settings.journal_rotate_seconds,
+                fsync=settings.journal_fsync,
+                compress=settings.journal_compress,
+            )
+            if settings.journal_enabled
+            else None
+        )
+        # Final game_info answers, reused for near-identical first-turn questions
+        self.answers = (
+            SemanticAnswerCache(
+                max_entries=settings.answer_cache_size,
+                ttl_seconds=settings.answer_cache_ttl_seconds,
+                threshold=settings.answer_cache_threshold,
+                path=settings.answer_cache_path,
+            )
+            if settings.answer_cache_enabled
+            else None
+        )
+        self.packer = ContextPacker(
+            context_window=settings.context_window_tokens,
+            max_context_tokens=settings.context_max_tokens,
+            igdb_max_tokens=settings.igdb_context_max_tokens,
+            min_score=settings.rag_min_score,
+            duplicate_threshold=settings.rag_duplicate_threshold,
+            mmr_lambda=settings.rag_mmr_lambda,
+        )
+        self.metrics = StageMetrics()
         self.logger = logger
 
+    # start loading the embedding model and Pinecone client without blocking startup
+    def start_background_init(self):
+        if self._init_task is None:
+            self._init_task = asyncio.create_task(self._initialize())
+
+    async def _initialize(self):
+        try:
+            await asyncio.gather(
+                asyncio.to_thread(self._load_embedder),
+                asyncio.to_thread(self._init_retriever),
+            )
+            self.logger.info("Embedding model and vector index ready")
+        except Exception as e:
+            self.logger.error(f"Error during background init: {e}")
+            traceback.print_exc()
+            raise
+
+    def _load_embedder(self):
+        # Imported here so that importing this module doesn't pull in torch
+        from sentence_transformers import SentenceTransformer
+
+        model = SentenceTransformer(settings.embedding_model_name)
+        if settings.embedding_warmup:
+            # The first forward pass pays for lazy weight/kernel setup; do it before taking traffic
+            model.encode(["warmup"])
+        if settings.router_enabled:
+            self.router.fit(model)
+        self.embeddings.model = model
+
+    def _init_retriever(self):
+        if settings.retriever_backend == "local":
+            self.retriever = LocalRetriever(
+                settings.local_index_path,
+                ann=settings.local_index_ann,
+                nprobe=settings.local_index_nprobe,
+            )
+            return
+
+        from pinecone import Pinecone
+
+        env_vars, _ = load_env()
+        pinecone = Pinecone(api_key=env_vars.get("PINECONE_API_KEY"))
+        self.retriever = PineconeRetriever(pinecone.Index(settings.pinecone_index_name))
+
+    async def wait_until_ready(self):
+        self.start_background_init()
+        await asyncio.shield(self._init_task)
+
+    @property
+    def ready(self) -> bool:
+        return (
+            self.pool is not None
+            and self._init_task is not None
+            and self._init_task.done()
+            and not self._init_task.cancelled()
+            and self._init_task.exception() is None
+        )
+
+    @property
+    def init_failed(self) -> bool:
+        return (
+            self._init_task is not None
+            and self._init_task.done()
+            and (self._init_task.cancelled() or self._init_task.exception() is not None)
+        )
+
     # connect to the MCP server
     async def connect_to_server(self, server_script_path: str):
         try:
@@ -46,36 +231,28 @@ class MCPClient:
                 raise ValueError("Server script must be a .py or .js file")
 
             command = "python" if is_python else "node"
+            _, full_env = load_env()
             server_params = StdioServerParameters(
-                command=command, args=[server_script_path], env=full_env
+                # Servers split per-client upstream quotas (IGDB's rate limit) by the pool size
+                command=command,
+                args=[server_script_path],
+                env={**full_env, "MCP_POOL_SIZE": str(settings.mcp_pool_size)},
             )
 
-            stdio_transport = await self.exit_stack.enter_async_context(
-                stdio_client(server_params)
-            )
-            self.stdio, self.write = stdio_transport
-            self.session = await self.exit_stack.enter_async_context(
-                ClientSession(self.stdio, self.write)
+            # Several server processes, so one slow tool call can't block the others
+            self.pool = await self.exit_stack.enter_async_context(
+                MCPSessionPool(
+                    server_params,
+                    size=settings.mcp_pool_size,
+                    call_timeout=settings.mcp_call_timeout_seconds,
+                    health_interval=settings.mcp_health_interval_seconds,
+                    message_handler=self._handle_server_message,
+                )
             )
 
-            await self.session.initialize()
-
-            self.logger.info("Connected to MCP server")
-
-            mcp_tools = await self.get_mcp_tools()
-            self.tools = [
-                {
-                    "type": "function",
-                    "function": {
-                        "name": tool.name,
-                        "description": tool.description,
-                        "parameters": tool.inputSchema,
-                    }
-                }
-                for tool in mcp_tools
-            ]
-
+            self.logger.info(f"Connected to {settings.mcp_pool_size} MCP server(s)")
 
+            await self.get_mcp_tools()
             self.logger.info(
                 f"Available tools: {[tool['function']['name'] for tool in self.tools]}"
             )
@@ -90,120 +267,433 @@ class MCPClient:
 
     # get mcp tool list
     async def get_mcp_tools(self):
+        if self._tool_catalog is not None:
+            return self._tool_catalog
         try:
-            response = await self.session.list_tools()
-            return response.tools
+            response = await self.pool.list_tools()
         except Exception as e:
             self.logger.error(f"Error getting MCP tools: {e}")
             raise
 
+        self._tool_catalog = response.tools
+        catalog_json = json.dumps([tool.model_dump(mode="json") for tool in response.tools], sort_keys=True)
+        self.tools_etag = '"' + hashlib.sha256(catalog_json.encode()).hexdigest()[:32] + '"'
+        self.tools = [
+            {
+                "type": "function",
+                "function": {
+                    "name": tool.name,
+                    "description": tool.description,
+                    "parameters": tool.inputSchema,
+                }
+            }
+            for tool in response.tools
+        ]
+        return self._tool_catalog
+
+    async def _handle_server_message(self, message):
+        if isinstance(message, types.ServerNotification) and isinstance(
+            message.root, types.ToolListChangedNotification
+        ):
+            self.logger.info("MCP tool list changed, dropping cached catalog")
+            self._tool_catalog = None
+
 # Replace your existing process_query with this:
-    async def process_query(self, query: str):
+    async def process_query(self, query: str, session_id: str = "default", trace: Optional[Trace] = None):
+        messages = None
+        async for event in self.process_query_stream(query, session_id, trace):
+            if event["type"] == "done":
+                messages = event["messages"]
+        return messages
+
+    async def process_query_stream(
+        self, query: str, session_id: str = "default", trace: Optional[Trace] = None
+    ):
+        """
+        Answer a query as a stream of events: `status` events as each stage finishes,
+        `token` events as the answer is generated, then one `done` event carrying the
+        recorded [user, assistant] messages. Stage timings go to `trace`.
+        """
+        trace = trace or Trace(self.metrics)
+        started = time.perf_counter()
+        user_message = {"role": "user", "content": query}
+        history = self.conversations.history(session_id) + [user_message]
+        reply = ""
         try:
-            self.logger.info(f"Processing query: {query}")
-            self.messages.append({"role": "user", "content": query})
-
-            # Classification
-            classification_response = self.llm.chat.completions.create(
-                model="llama3-70b-8192",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": """You are a smart assistant router.
-
-    Classify the user's message:
-    - "game_info": for any video game questions.
-    - "get_docs": for coding, libraries.
-    - "general": for general questions.
-
-    Respond in JSON format only.
-
-    Examples:
-    {"action": "game_info", "game_name": "Witcher 3", "user_friendly_response": "Here's info about Witcher 3:"}
-    {"action": "get_docs", "query": "Streaming API", "library": "openai", "user_friendly_response": "..."}
-    {"action": "general", "user_friendly_response": "..."}
-    """
-                    },
-                    {"role": "user", "content": query},
-                ],
-                max_tokens=150,
-            )
-
-            classification_json = classification_response.choices[0].message.content
-            try:
-                parsed = json.loads(classification_json)
-            except Exception as e:
-                self.logger.error(f"Failed to parse LLM output: {e}")
-                self.logger.error(f"Raw: {classification_json}")
+            self.logger.info(f"Processing query {trace.trace_id}: {query}")
+
+            # Classification: the local router first, the LLM only when it isn't confident
+            with trace.span("router"):
+                route = await self.router.route(query)
+
+            # A repeat of an earlier first-turn question can reuse its answer. Checking before
+            # the LLM classifier means a hit spends no Groq tokens at all.
+            cacheable = self.answers is not None and len(history) == 1
+            cached, cache_checked = None, False
+            if cacheable and route is not None and route.action == "game_info" and route.game_name:
+                cached = await self._cached_answer(route.game_name, query, trace)
+                cache_checked = True
+
+            if cached is not None or (route is not None and route.confident):
+                parsed = route.as_action(query)
+            else:
+                with trace.span("classify_llm"):
+                    parsed = await self._classify_with_llm(query)
+                if parsed is None and route is not None:
+                    # A low-confidence local guess still beats failing the request
+                    parsed = route.as_action(query)
+            if parsed is None:
                 assistant_reply = "❌ Sorry, I couldn't understand your request."
-                self.messages.append({"role": "assistant", "content": assistant_reply})
-                return self.messages[-2:]
+                yield {"type": "token", "content": assistant_reply}
+                yield {"type": "done", "messages": self._record_turn(session_id, user_message, assistant_reply)}
+                return
 
             action = parsed.get("action")
-
-            if action == "game_info":
-                # 🔧 Call IGDB Tool
-                igdb_result = await self.session.call_tool("search_game_info", {"game_name": parsed.get("game_name")})
-                igdb_text = igdb_result.content[0].text if igdb_result.content else "No IGDB info found."
-
-                # 🔍 RAG with Pinecone
-                vector = embedder.encode(query).tolist()
-                pinecone_results = index.query(vector=vector, top_k=5, include_metadata=True)
-                rag_context = "\n\n".join([match.metadata["text"] for match in pinecone_results.matches]) or "No additional info."
-
-                print("\n🔧 IGDB TOOL RESULT:")
-                print(igdb_text)
-
-                print("\n📚 RAG CONTEXT:")
-                print(rag_context)                
+            cache_game = None
+            if action == "game_info" and cacheable:
+                # Answers are keyed by the router's canonical title, whichever classifier ran,
+                # so one stored on the LLM path is found by the lookup above next time
+                if route is not None and route.game_name:
+                    cache_game = route.game_name
+                else:
+                    cache_game = await self._canonical_game(parsed.get("game_name"))
+                if not cache_checked:
+                    cached = await self._cached_answer(cache_game, query, trace)
+            yield {"type": "status", "stage": "classified", "action": action}
+
+            if cached is not None:
+                yield {"type": "status", "stage": "answer_cached"}
+                yield {"type": "token", "content": cached}
+                yield {"type": "done", "messages": self._record_turn(session_id, user_message, cached)}
+
+            elif action == "game_info":
+                # 🔧 IGDB tool and 🔍 Pinecone RAG run side by side, each with its own deadline
+                igdb_task = asyncio.create_task(
+                    self._with_deadline(
+                        self._fetch_igdb_info(parsed.get("game_name"), trace),
+                        settings.igdb_deadline_seconds,
+                        IGDB_PLACEHOLDER,
+                        "IGDB lookup",
+                    )
+                )
+                rag_task = asyncio.create_task(
+                    self._with_deadline(
+                        self._fetch_rag_matches(query, trace),
+                        settings.rag_deadline_seconds,
+                        [],
+                        "RAG retrieval",
+                    )
+                )
+                stages = {igdb_task: "igdb_done", rag_task: "rag_done"}
+                try:
+                    pending = set(stages)
+                    while pending:
+                        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                        for task in done:
+                            yield {"type": "status", "stage": stages[task]}
+                finally:
+                    # The client may disconnect mid-stream
+                    for task in stages:
+                        task.cancel()
+                igdb_text, matches = igdb_task.result(), rag_task.result()
+                with trace.span("pack"):
+                    messages, rag_context = _pack_prompt(self.packer, igdb_text, matches, query, history, 700)
+
+                if trace.sampled(settings.trace_log_sample_rate):
+                    self.logger.info(f"[{trace.trace_id}] IGDB result: {_clip(igdb_text)}")
+                    self.logger.info(f"[{trace.trace_id}] RAG context: {_clip(rag_context)}")
 
                 # 🧠 Final LLM call
-                smart_response = self.llm.chat.completions.create(
-                    model="llama3-70b-8192",
-                    messages=self.messages + [
-                        {
-                            "role": "system",
-                            "content": "Use the info below to answer user's game question. Combine both IGDB and game database context.",
-                        },
-                        {"role": "user", "content": f"IGDB Info:\n{igdb_text}\n\nOther Context:\n{rag_context}\n\nQuestion: {query}"}
-                    ],
-                    max_tokens=700
-                )
+                async for token in self._timed_stream(trace, messages=messages, max_tokens=700):
+                    reply += token
+                    yield {"type": "token", "content": token}
 
-                final_reply = smart_response.choices[0].message.content
-                self.messages.append({"role": "assistant", "content": final_reply})
-                return self.messages[-2:]
+                # Answers built on degraded context aren't worth repeating
+                if cacheable and igdb_text != IGDB_PLACEHOLDER and rag_context != RAG_PLACEHOLDER:
+                    await self._store_answer(cache_game, query, reply)
+                yield {"type": "done", "messages": self._record_turn(session_id, user_message, reply)}
 
             elif action == "get_docs":
-                # your existing doc lookup logic...
-                pass
+                # The LLM classifier may say "LangChain" or "llama index"; the tool wants its own names
+                library = LIBRARY_ALIASES.get(str(parsed.get("library") or "").lower())
+                docs_text = await self._with_deadline(
+                    self._fetch_docs(parsed.get("query") or query, library, trace),
+                    settings.docs_deadline_seconds,
+                    DOCS_PLACEHOLDER,
+                    "Docs lookup",
+                )
+                yield {"type": "status", "stage": "docs_done"}
+
+                async for token in self._timed_stream(
+                    trace, messages=history + _docs_prompt(docs_text, library, query), max_tokens=700
+                ):
+                    reply += token
+                    yield {"type": "token", "content": token}
+                yield {"type": "done", "messages": self._record_turn(session_id, user_message, reply)}
 
             else:
                 # fallback general LLM chat
-                fallback = self.llm.chat.completions.create(
-                    model="llama3-70b-8192",
-                    messages=self.messages,
+                async for token in self._timed_stream(
+                    trace,
+                    messages=history,
                     max_tokens=500,
-                )
-                reply = fallback.choices[0].message.content
-                self.messages.append({"role": "assistant", "content": reply})
-                return self.messages[-2:]
+                ):
+                    reply += token
+                    yield {"type": "token", "content": token}
+                yield {"type": "done", "messages": self._record_turn(session_id, user_message, reply)}
 
         except Exception as e:
             self.logger.error(f"Error processing query: {e}")
-            error_msg = {"role": "assistant", "content": "❌ Something went wrong."}
-            self.messages.append(error_msg)
-            return self.messages[-2:]
+            error_reply = "❌ Something went wrong."
+            yield {"type": "error", "content": error_reply}
+            yield {"type": "done", "messages": self._record_turn(session_id, user_message, error_reply)}
+        finally:
+            trace.record("total", time.perf_counter() - started)
+            self.logger.info(f"Trace {trace.trace_id}: {trace.summary()}")
+
+    async def _timed_stream(self, trace: Trace, **kwargs):
+        """LLM token stream that records time to first token and total generation time."""
+        start = time.perf_counter()
+        first = True
+        try:
+            async for token in self.llm.stream(**kwargs):
+                if first:
+                    trace.record("llm_first_token", time.perf_counter() - start)
+                    first = False
+                yield token
+        finally:
+            trace.record("llm", time.perf_counter() - start)
+
+    async def _classify_with_llm(self, query: str) -> Optional[dict]:
+        classification_response = await self.llm.chat(
+            messages=[
+                {
+                    "role": "system",
+                    "content": """You are a smart assistant router.
+
+Classify the user's message:
+- "game_info": for any video game questions.
+- "get_docs": for coding, libraries.
+- "general": for general questions.
+
+Respond in JSON format only.
+
+Examples:
+{"action": "game_info", "game_name": "Witcher 3", "user_friendly_response": "Here's info about Witcher 3:"}
+{"action": "get_docs", "query": "Streaming API", "library": "openai", "user_friendly_response": "..."}
+{"action": "general", "user_friendly_response": "..."}
+"""
+                },
+                {"role": "user", "content": query},
+            ],
+            max_tokens=150,
+        )
+
+        classification_json = classification_response.choices[0].message.content
+        try:
+            return json.loads(classification_json)
+        except Exception as e:
+            self.logger.error(f"Failed to parse LLM output: {e}")
+            self.logger.error(f"Raw: {classification_json}")
+            return None
+
+    async def _fetch_igdb_info(self, game_name: str, trace: Trace):
+        with trace.span("igdb"):
+            # The trace id rides along in _meta so the server's spans can be matched up
+            igdb_result = await self.pool.call_tool(
+                "search_game_info", {"game_name": game_name}, meta={"trace_id": trace.trace_id}
+            )
+        return igdb_result.content[0].text if igdb_result.content else IGDB_PLACEHOLDER
+
+    async def _fetch_docs(self, query: str, library: Optional[str], trace: Trace):
+        """Excerpts from the library's docs via the get_docs tool (langchain, llama-index, openai)."""
+        if library is None:
+            return DOCS_PLACEHOLDER
+        with trace.span("docs"):
+            result = await self.pool.call_tool(
+                "get_docs", {"query": query, "library": library}, meta={"trace_id": trace.trace_id}
+            )
+        if result.isError or not result.content:
+            self.logger.warning(f"get_docs failed for {library}: {result.content}")
+            return DOCS_PLACEHOLDER
+        return result.content[0].text
+
+    async def _fetch_rag_matches(self, query: str, trace: Trace):
+        with trace.span("model_wait"):
+            await self.wait_until_ready()
+        with trace.span("embed"):
+            vector = await self.embeddings.encode(query)
+        # Retrievers are synchronous (Pinecone does a network round trip), so keep them off the event loop
+        with trace.span("retrieve"):
+            return await asyncio.to_thread(self.retriever.query, vector, settings.rag_candidates)
+
+    async def process_batch(self, items: List[Dict[str, str]]):
+        """
+        Answer many single-turn game questions (`{"game_name", "query"}` dicts), yielding a
+        `result` or `error` event for each as soon as it's ready, then a `done` event.
+
+        Game names are deduplicated and looked up through search_games_batch (IGDB
+        multiquery) in chunks, all queries are embedded in one pass and retrieved with
+        one vectorized search, and only the final answers go to the LLM one by one.
+        """
+        if not items:
+            yield {"type": "done", "count": 0}
+            return
+        trace = Trace(self.metrics)
+        names = list(dict.fromkeys(item["game_name"] for item in items))
+        chunk_size = settings.batch_igdb_chunk_size
+        igdb_tasks: Dict[str, asyncio.Task] = {}
+        for start in range(0, len(names), chunk_size):
+            chunk = names[start : start + chunk_size]
+            task = asyncio.create_task(self._fetch_igdb_batch(chunk, trace))
+            for name in chunk:
+                igdb_tasks[name] = task
+
+        answer_tasks = []
+        try:
+            queries = [item["query"] for item in items]
+            try:
+                with trace.span("model_wait"):
+                    await self.wait_until_ready()
+                with trace.span("batch_embed"):
+                    vectors = await self.embeddings.encode_many(queries)
+                with trace.span("batch_retrieve"):
+                    matches = await asyncio.to_thread(self.retriever.query_batch, vectors, settings.rag_candidates)
+            except Exception as e:
+                # Like a single query past its RAG deadline: answer from IGDB alone (and skip the cache)
+                self.logger.error(f"Batch {trace.trace_id} retrieval failed, answering without RAG context: {e}")
+                vectors, matches = [None] * len(items), [[] for _ in items]
+            # Repeated questions in one batch share a single answer
+            groups: Dict[tuple, List[int]] = {}
+            for index, item in enumerate(items):
+                groups.setdefault((normalize_query(item["game_name"]), normalize_query(item["query"])), []).append(index)
+            answer_tasks = [
+                asyncio.create_task(
+                    self._answer_batch_item(
+                        indexes, items[indexes[0]], vectors[indexes[0]], matches[indexes[0]],
+                        igdb_tasks[items[indexes[0]]["game_name"]],
+                    )
+                )
+                for indexes in groups.values()
+            ]
+            for next_done in asyncio.as_completed(answer_tasks):
+                indexes, event = await next_done
+                for index in indexes:
+                    yield {**event, "index": index, **items[index]}
+            yield {"type": "done", "count": len(items)}
+        finally:
+            # The client may disconnect mid-stream
+            for task in list(igdb_tasks.values()) + answer_tasks:
+                task.cancel()
+            self.logger.info(f"Batch {trace.trace_id} of {len(items)} queries: {trace.summary()}")
+
+    async def _fetch_igdb_batch(self, game_names: List[str], trace: Trace) -> Dict[str, str]:
+        result = await self.pool.call_tool(
+            "search_games_batch",
+            {"game_names": game_names},
+            timeout=settings.batch_igdb_timeout_seconds,
+            meta={"trace_id": trace.trace_id},
+        )
+        return json.loads(result.content[0].text) if result.content else {}
+
+    async def _answer_batch_item(self, indexes: List[int], item: Dict[str, str], vector, matches, igdb_task):
+        game_name, query = item["game_name"], item["query"]
+        try:
+            cache_game = await self._canonical_game(game_name)
+            cacheable = self.answers is not None and vector is not None
+            if cacheable:
+                cached = self.answers.get(cache_game, vector)
+                if cached is not None:
+                    return indexes, {"type": "result", "answer": cached, "cached": True}
+
+            try:
+                igdb_text = (await igdb_task).get(game_name) or IGDB_PLACEHOLDER
+            except Exception as e:
+                self.logger.error(f"Batch IGDB lookup failed: {e}")
+                igdb_text = IGDB_PLACEHOLDER
+            messages, rag_context = _pack_prompt(self.packer, igdb_text, matches, query, [], 700)
+
+            response = await self.llm.chat(messages=messages, max_tokens=700)
+            answer = response.choices[0].message.content
+            if cacheable and igdb_text != IGDB_PLACEHOLDER and rag_context != RAG_PLACEHOLDER:
+                self.answers.put(cache_game, query, vector, answer)
+            return indexes, {"type": "result", "answer": answer, "cached": False}
+        except Exception as e:
+            self.logger.error(f"Batch query for {game_name} failed: {e}")
+            return indexes, {"type": "error", "error": str(e)}
+
+    async def _canonical_game(self, game_name: Optional[str]) -> Optional[str]:
+        """The known title a free-form game name refers to ("witcher 3" -> "The Witcher 3: Wild Hunt")."""
+        if not game_name or not self.router.titles:
+            return game_name
+        return await asyncio.to_thread(self.router.extract_title, game_name) or game_name
+
+    async def _cached_answer(self, game_name: Optional[str], query: str, trace: Trace) -> Optional[str]:
+        if not game_name or self.embeddings.model is None:
+            return None
+        with trace.span("answer_cache"):
+            vector = await self.embeddings.encode(query)
+            return self.answers.get(game_name, vector)
+
+    async def _store_answer(self, game_name: Optional[str], query: str, reply: str):
+        if not game_name or not reply or self.embeddings.model is None:
+            return
+        # Already computed by the lookup, so this is an embedding cache hit
+        vector = await self.embeddings.encode(query)
+        self.answers.put(game_name, query, vector, reply)
+
+    async def _with_deadline(self, coro, timeout: float, placeholder: str, label: str):
+        """Await a context branch, degrading to its placeholder if it fails or runs late."""
+        try:
+            return await asyncio.wait_for(coro, timeout)
+        except asyncio.TimeoutError:
+            self.logger.warning(f"{label} exceeded its {timeout}s deadline")
+        except Exception as e:
+            self.logger.error(f"{label} failed: {e}")
+        return placeholder
+
+    def _record_turn(self, session_id: str, user_message: dict, reply: str):
+        assistant_message = {"role": "assistant", "content": reply}
+        self.conversations.append(session_id, user_message, assistant_message)
+        if self.journal is not None:
+            self.journal.record(session_id, user_message)
+            self.journal.record(session_id, assistant_message)
+        return [user_message, assistant_message]
+
+    async def render_metrics(self) -> str:
+        """Prometheus text for this process's stage timings and the MCP servers' spans."""
+        remote = []
+        if self.pool is not None:
+            for result in await self.pool.read_resource_all("stats://timings"):
+                try:
+                    remote.append(json.loads(result.contents[0].text))
+                except Exception as e:
+                    self.logger.warning(f"Ignoring unreadable MCP server timings: {e}")
+        return self.metrics.render(remote)
+
+    def reset_session(self, session_id: str):
+        self.conversations.reset(session_id)
+
+    def stats(self):
+        return {
+            "sessions": len(self.conversations),
+            "embeddings": self.embeddings.metrics.snapshot(),
+            "embedding_cache": self.embeddings.cache.stats(),
+            "router": self.router.stats(),
+            "answer_cache": self.answers.stats() if self.answers is not None else None,
+            "context_packer": self.packer.stats(),
+            "journal": self.journal.stats() if self.journal is not None else None,
+            "mcp_pool": self.pool.stats() if self.pool is not None else None,
+        }
 
 
     # call llm
-    async def call_llm(self):
+    async def call_llm(self, session_id: str = "default"):
         try:
             self.logger.info("Calling LLM")
-            response = self.llm.chat.completions.create(
-                model="llama3-70b-8192",
+            response = await self.llm.chat(
                 max_tokens=1000,
-                messages=self.messages,
+                messages=self.conversations.history(session_id),
             )
             return response
         except Exception as e:
@@ -215,56 +705,17 @@ class MCPClient:
     # cleanup
     async def cleanup(self):
         try:
+            if self._init_task is not None and not self._init_task.done():
+                self._init_task.cancel()
             await self.exit_stack.aclose()
+            await self.embeddings.stop()
+            if self.answers is not None:
+                self.answers.save()
+            await self.llm.close()
+            if self.journal is not None:
+                await self.journal.close()
             self.logger.info("Disconnected from MCP server")
         except Exception as e:
             self.logger.error(f"Error during cleanup: {e}")
             traceback.print_exc()
             raise
-
-    async def log_conversation(self):
-        os.makedirs("conversations", exist_ok=True)
-        serializable_conversation = []
-
-        for message in self.messages:
-            try:
-                serializable_message = {"role": message["role"], "content": []}
-
-                content = message["content"]
-
-                # If content is just a string (e.g. user input or assistant reply)
-                if isinstance(content, str):
-                    serializable_message["content"] = content
-
-                # If content is a list (like tool results)
-                elif isinstance(content, list):
-                    for item in content:
-                        if hasattr(item, "model_dump"):
-                            serializable_message["content"].append(item.model_dump())
-                        else:
-                            serializable_message["content"].append(item)
-
-                # If content is a Pydantic object like `ChatCompletionMessage`
-                elif hasattr(content, "model_dump"):
-                    serializable_message["content"] = content.model_dump()
-
-                else:
-                    serializable_message["content"] = content  # fallback
-
-                serializable_conversation.append(serializable_message)
-
-            except Exception as e:
-                self.logger.error(f"Error processing message for logging: {e}")
-                self.logger.debug(f"Message content: {message}")
-                raise
-
-        timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        filepath = os.path.join("conversations", f"conversation_{timestamp}.json")
-
-        try:
-            with open(filepath, "w") as f:
-                json.dump(serializable_conversation, f, indent=2, default=str)
-        except Exception as e:
-            self.logger.error(f"Error writing conversation to file: {e}")
-            self.logger.debug(f"Conversation data: {serializable_conversation}")
-            raise
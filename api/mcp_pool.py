@@ -0,0 +1,239 @@
+import asyncio
+from typing import Any, Callable, Dict, List, Optional
+
+from mcp import ClientSession, StdioServerParameters, types
+from mcp.client.stdio import stdio_client
+from utils.logger import logger
+
+
+class MCPServerProcess:
+    """
+    One MCP server subprocess and its client session.
+
+    The stdio transport and session are entered and exited by a single owner task
+    (anyio cancel scopes must be closed by the task that opened them), which just
+    holds them open until `stop` is called or the server dies.
+    """
+
+    def __init__(
+        self,
+        server_params: StdioServerParameters,
+        name: str,
+        message_handler: Optional[Callable] = None,
+    ):
+        self.server_params = server_params
+        self.name = name
+        self.message_handler = message_handler
+        self.session: Optional[ClientSession] = None
+        self.outstanding = 0
+        self.consecutive_failures = 0
+        self.error: Optional[BaseException] = None
+        self._ready = asyncio.Event()
+        self._stop = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def healthy(self) -> bool:
+        return self.session is not None and self._task is not None and not self._task.done()
+
+    async def start(self, timeout: float):
+        self._task = asyncio.create_task(self._run())
+        await asyncio.wait_for(self._ready.wait(), timeout)
+        if self.session is None:
+            raise RuntimeError(f"MCP server {self.name} failed to start: {self.error}")
+
+    async def _run(self):
+        try:
+            async with stdio_client(self.server_params) as (read, write):
+                async with ClientSession(read, write, message_handler=self.message_handler) as session:
+                    await session.initialize()
+                    self.session = session
+                    self._ready.set()
+                    await self._stop.wait()
+        except Exception as e:
+            self.error = e
+            logger.error(f"MCP server {self.name} exited: {e}")
+        finally:
+            self.session = None
+            self._ready.set()
+
+    async def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(asyncio.shield(self._task), timeout)
+        except asyncio.TimeoutError:
+            self._task.cancel()
+        except Exception:
+            pass
+
+
+class MCPSessionPool:
+    """
+    A pool of MCP server subprocesses, each with its own session.
+
+    Calls go to the healthy server with the fewest outstanding requests, so one slow
+    tool call only ties up one process. Every call has a timeout. A background loop
+    pings each server and respawns any that crashed, stopped answering pings, or
+    timed out `max_failures` calls in a row. Server notifications from every session
+    are passed to `message_handler`.
+    """
+
+    def __init__(
+        self,
+        server_params: StdioServerParameters,
+        size: int = 2,
+        call_timeout: float = 30.0,
+        start_timeout: float = 30.0,
+        health_interval: float = 15.0,
+        health_timeout: float = 5.0,
+        max_failures: int = 3,
+        message_handler: Optional[Callable] = None,
+    ):
+        self.server_params = server_params
+        self.message_handler = message_handler
+        self.size = size
+        self.call_timeout = call_timeout
+        self.start_timeout = start_timeout
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout
+        self.max_failures = max_failures
+        self.members: List[MCPServerProcess] = []
+        self.restarts = 0
+        self.logger = logger
+        self._generation = 0
+        self._health_task: Optional[asyncio.Task] = None
+        self._respawning: Dict[int, asyncio.Task] = {}
+
+    def _new_member(self) -> MCPServerProcess:
+        self._generation += 1
+        return MCPServerProcess(self.server_params, f"mcp-{self._generation}", self.message_handler)
+
+    async def __aenter__(self):
+        self.members = [self._new_member() for _ in range(self.size)]
+        results = await asyncio.gather(
+            *(member.start(self.start_timeout) for member in self.members), return_exceptions=True
+        )
+        failures = [result for result in results if isinstance(result, BaseException)]
+        if len(failures) == len(self.members):
+            await self._stop_all()
+            raise RuntimeError(f"No MCP server could be started: {failures[0]}")
+        for failure in failures:
+            self.logger.error(f"MCP server failed to start, will retry: {failure}")
+        self._health_task = asyncio.create_task(self._health_loop())
+        return self
+
+    async def __aexit__(self, *exc_info):
+        if self._health_task is not None:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+        for task in list(self._respawning.values()):
+            task.cancel()
+        await self._stop_all()
+
+    async def _stop_all(self):
+        await asyncio.gather(*(member.stop() for member in self.members), return_exceptions=True)
+
+    def _pick(self) -> MCPServerProcess:
+        healthy = [member for member in self.members if member.healthy]
+        if not healthy:
+            raise RuntimeError("No healthy MCP server available")
+        return min(healthy, key=lambda member: member.outstanding)
+
+    async def call_tool(
+        self,
+        name: str,
+        arguments: Dict[str, Any],
+        timeout: Optional[float] = None,
+        meta: Optional[Dict[str, Any]] = None,
+    ):
+        """Call a tool on the least busy server. `meta` is sent as the request's `_meta`."""
+        member = self._pick()
+        member.outstanding += 1
+        try:
+            result = await asyncio.wait_for(
+                self._send_call(member.session, name, arguments, meta), timeout or self.call_timeout
+            )
+            member.consecutive_failures = 0
+            return result
+        except asyncio.TimeoutError:
+            member.consecutive_failures += 1
+            self.logger.warning(f"{name} timed out on {member.name}")
+            if member.consecutive_failures >= self.max_failures:
+                self._schedule_respawn(member)
+            raise
+        finally:
+            member.outstanding -= 1
+
+    @staticmethod
+    def _send_call(session: ClientSession, name: str, arguments: Dict[str, Any], meta: Optional[Dict[str, Any]]):
+        if not meta:
+            return session.call_tool(name, arguments)
+        # ClientSession.call_tool can't attach _meta, so build the request ourselves
+        request = types.ClientRequest(
+            types.CallToolRequest(
+                method="tools/call",
+                params=types.CallToolRequestParams(name=name, arguments=arguments, _meta=meta),
+            )
+        )
+        return session.send_request(request, types.CallToolResult)
+
+    async def read_resource_all(self, uri: str) -> List[Any]:
+        """Read a resource from every healthy server, e.g. per-process counters."""
+        healthy = [member for member in self.members if member.healthy]
+        results = await asyncio.gather(
+            *(asyncio.wait_for(member.session.read_resource(uri), self.call_timeout) for member in healthy),
+            return_exceptions=True,
+        )
+        return [result for result in results if not isinstance(result, BaseException)]
+
+    async def list_tools(self):
+        member = self._pick()
+        return await asyncio.wait_for(member.session.list_tools(), self.call_timeout)
+
+    def _schedule_respawn(self, member: MCPServerProcess):
+        key = id(member)
+        if key not in self._respawning:
+            task = asyncio.create_task(self._respawn(member))
+            self._respawning[key] = task
+            task.add_done_callback(lambda _: self._respawning.pop(key, None))
+
+    async def _respawn(self, member: MCPServerProcess):
+        self.logger.warning(f"Respawning MCP server {member.name}")
+        replacement = self._new_member()
+        try:
+            await replacement.start(self.start_timeout)
+        except Exception as e:
+            self.logger.error(f"Failed to respawn {member.name}: {e}")
+            await replacement.stop()
+            return
+        self.members[self.members.index(member)] = replacement
+        self.restarts += 1
+        # Let calls already running on the old process finish before stopping it
+        await member.stop(timeout=self.call_timeout)
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            for member in list(self.members):
+                if not member.healthy:
+                    self._schedule_respawn(member)
+                    continue
+                try:
+                    await asyncio.wait_for(member.session.send_ping(), self.health_timeout)
+                except Exception as e:
+                    self.logger.warning(f"MCP server {member.name} failed its health check: {e}")
+                    self._schedule_respawn(member)
+
+    def stats(self):
+        return {
+            "servers": [
+                {"name": member.name, "healthy": member.healthy, "outstanding": member.outstanding}
+                for member in self.members
+            ],
+            "restarts": self.restarts,
+        }
@@ -0,0 +1,100 @@
+import time
+import uuid
+import zlib
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Upper bounds in seconds; the MCP server uses the same ones so its histograms merge cleanly
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class StageMetrics:
+    """Latency histograms per request stage, rendered in the Prometheus text format."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        self._stages: Dict[str, Dict] = {}
+
+    def observe(self, stage: str, seconds: float):
+        histogram = self._stages.get(stage)
+        if histogram is None:
+            histogram = self._stages[stage] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+        index = next((i for i, bound in enumerate(self.buckets) if seconds <= bound), len(self.buckets))
+        histogram["counts"][index] += 1
+        histogram["sum"] += seconds
+        histogram["count"] += 1
+
+    def render(self, remote: Iterable[Dict] = ()) -> str:
+        """
+        Prometheus exposition of the API's stage histograms, plus the span histograms
+        reported by each MCP server process (summed across processes).
+        """
+        lines = [
+            "# HELP gamedex_stage_seconds Time spent in each stage of answering a query.",
+            "# TYPE gamedex_stage_seconds histogram",
+        ]
+        for stage, histogram in sorted(self._stages.items()):
+            lines += _histogram_lines("gamedex_stage_seconds", {"stage": stage}, self.buckets, histogram)
+
+        merged: Dict[str, Dict] = {}
+        buckets = self.buckets
+        for snapshot in remote:
+            buckets = tuple(snapshot["buckets"])
+            for span, histogram in snapshot["spans"].items():
+                total = merged.setdefault(span, {"counts": [0] * len(histogram["counts"]), "sum": 0.0, "count": 0})
+                total["counts"] = [a + b for a, b in zip(total["counts"], histogram["counts"])]
+                total["sum"] += histogram["sum"]
+                total["count"] += histogram["count"]
+        lines += [
+            "# HELP gamedex_mcp_span_seconds Time spent in MCP server tools and their stages.",
+            "# TYPE gamedex_mcp_span_seconds histogram",
+        ]
+        for span, histogram in sorted(merged.items()):
+            lines += _histogram_lines("gamedex_mcp_span_seconds", {"span": span}, buckets, histogram)
+        return "\n".join(lines) + "\n"
+
+
+def _histogram_lines(name: str, labels: Dict[str, str], buckets, histogram) -> List[str]:
+    label_text = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    lines, cumulative = [], 0
+    for bound, count in zip(list(buckets) + ["+Inf"], histogram["counts"]):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+    lines.append(f"{name}_sum{{{label_text}}} {histogram['sum']}")
+    lines.append(f"{name}_count{{{label_text}}} {histogram['count']}")
+    return lines
+
+
+class Trace:
+    """
+    Stage timings for one request. Every span feeds `metrics`, and the spans are
+    kept so they can be returned as a `Server-Timing` header.
+    """
+
+    def __init__(self, metrics: Optional[StageMetrics] = None, trace_id: Optional[str] = None):
+        self.metrics = metrics
+        self.trace_id = trace_id or uuid.uuid4().hex[:16]
+        self.spans: List[Tuple[str, float]] = []
+
+    def record(self, stage: str, seconds: float):
+        self.spans.append((stage, seconds))
+        if self.metrics is not None:
+            self.metrics.observe(stage, seconds)
+
+    @contextmanager
+    def span(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def sampled(self, rate: float) -> bool:
+        """Decided by the trace id, the same way the MCP server samples its span logs."""
+        return zlib.crc32(self.trace_id.encode()) / 0xFFFFFFFF < rate
+
+    def server_timing(self) -> str:
+        return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in self.spans)
+
+    def summary(self) -> str:
+        return " ".join(f"{stage}={seconds * 1000:.0f}ms" for stage, seconds in self.spans)
@@ -0,0 +1,165 @@
+import json
+import os
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from utils.logger import logger
+
+
+@dataclass
+class Match:
+    id: str
+    score: float
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+class Retriever(ABC):
+    """Nearest-neighbour search over the game corpus."""
+
+    @abstractmethod
+    def query(self, vector: Sequence[float], top_k: int = 5) -> List[Match]:
+        ...
+
+    def query_batch(self, vectors: Sequence[Sequence[float]], top_k: int = 5) -> List[List[Match]]:
+        return [self.query(vector, top_k) for vector in vectors]
+
+
+class PineconeRetriever(Retriever):
+    def __init__(self, index):
+        self.index = index
+
+    def query(self, vector: Sequence[float], top_k: int = 5) -> List[Match]:
+        results = self.index.query(vector=list(vector), top_k=top_k, include_metadata=True)
+        return [Match(match.id, match.score, match.metadata or {}) for match in results.matches]
+
+    def query_batch(self, vectors: Sequence[Sequence[float]], top_k: int = 5) -> List[List[Match]]:
+        # Pinecone queries take one vector each, so overlap the round trips instead
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            return list(executor.map(lambda vector: self.query(vector, top_k), vectors))
+
+
+class LocalRetriever(Retriever):
+    """
+    In-process cosine search over a directory written by `LocalRetriever.build`:
+
+    - `vectors.npy`: float32 matrix of L2-normalised rows, opened memory-mapped so
+      several worker processes share the same pages
+    - `metadata.jsonl`: one JSON object per row, with `id` and the row's metadata
+    - `ivf.npz` (optional): k-means centroids and per-list row ids for approximate search
+
+    Exact search is a single matrix-vector product. With `ann=True` only the rows in
+    the `nprobe` lists whose centroids are closest to the query are scored.
+    """
+
+    def __init__(self, path: str, ann: bool = False, nprobe: int = 8):
+        self.path = path
+        self.nprobe = nprobe
+        self.vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+        with open(os.path.join(path, "metadata.jsonl")) as f:
+            self.metadata = [json.loads(line) for line in f]
+        if len(self.metadata) != len(self.vectors):
+            raise ValueError(
+                f"{path}: {len(self.vectors)} vectors but {len(self.metadata)} metadata rows"
+            )
+
+        self.centroids: Optional[np.ndarray] = None
+        self.lists: List[np.ndarray] = []
+        ivf_path = os.path.join(path, "ivf.npz")
+        if ann:
+            if os.path.exists(ivf_path):
+                ivf = np.load(ivf_path)
+                self.centroids = ivf["centroids"]
+                offsets = ivf["offsets"]
+                self.lists = np.split(ivf["rows"], offsets[1:-1])
+            else:
+                logger.warning(f"No IVF lists in {path}, falling back to exact search")
+        logger.info(f"Loaded local index with {len(self.metadata)} vectors from {path}")
+
+    def query(self, vector: Sequence[float], top_k: int = 5) -> List[Match]:
+        query = np.array(vector, dtype=np.float32)
+        query /= np.linalg.norm(query) or 1.0
+
+        if self.centroids is not None:
+            nearest_lists = np.argsort(self.centroids @ query)[::-1][: self.nprobe]
+            # Sorted so the memory-mapped reads walk the file forwards
+            rows = np.sort(np.concatenate([self.lists[i] for i in nearest_lists]))
+            scores = self.vectors[rows] @ query
+        else:
+            rows = None
+            scores = self.vectors @ query
+
+        return self._top_matches(scores, rows, top_k)
+
+    def query_batch(self, vectors: Sequence[Sequence[float]], top_k: int = 5, block: int = 256) -> List[List[Match]]:
+        """Exact search for many queries as one matrix product per block of queries."""
+        if len(vectors) == 0:
+            return []
+        if self.centroids is not None:
+            # Each query probes different lists, so there is nothing to share
+            return super().query_batch(vectors, top_k)
+        queries = np.array(vectors, dtype=np.float32).reshape(len(vectors), -1)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = queries / np.where(norms == 0, 1.0, norms)
+        results = []
+        for start in range(0, len(queries), block):
+            scores = queries[start : start + block] @ self.vectors.T
+            results.extend(self._top_matches(row, None, top_k) for row in scores)
+        return results
+
+    def _top_matches(self, scores: np.ndarray, rows: Optional[np.ndarray], top_k: int) -> List[Match]:
+        top_k = min(top_k, len(scores))
+        if top_k == 0:
+            return []
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        best = best[np.argsort(-scores[best])]
+
+        matches = []
+        for i in best:
+            row = int(rows[i]) if rows is not None else int(i)
+            record = self.metadata[row]
+            matches.append(Match(str(record.get("id", row)), float(scores[i]), record.get("metadata", {})))
+        return matches
+
+    @staticmethod
+    def build(
+        path: str,
+        vectors: np.ndarray,
+        records: List[Dict[str, Any]],
+        n_lists: int = 0,
+        iterations: int = 10,
+    ):
+        """Write an index directory. `records` are `{"id": ..., "metadata": {...}}` dicts."""
+        os.makedirs(path, exist_ok=True)
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1.0, norms)
+        np.save(os.path.join(path, "vectors.npy"), vectors)
+        with open(os.path.join(path, "metadata.jsonl"), "w") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+
+        if n_lists:
+            centroids, assignments = _kmeans(vectors, n_lists, iterations)
+            order = np.argsort(assignments, kind="stable")
+            counts = np.bincount(assignments, minlength=len(centroids))
+            offsets = np.concatenate([[0], np.cumsum(counts)])
+            np.savez(os.path.join(path, "ivf.npz"), centroids=centroids, rows=order, offsets=offsets)
+
+
+def _kmeans(vectors: np.ndarray, k: int, iterations: int):
+    """Spherical k-means, good enough to split the corpus into IVF lists."""
+    rng = np.random.default_rng(0)
+    k = min(k, len(vectors))
+    centroids = vectors[rng.choice(len(vectors), k, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+        for c in range(k):
+            members = vectors[assignments == c]
+            if len(members):
+                centroid = members.sum(axis=0)
+                centroids[c] = centroid / (np.linalg.norm(centroid) or 1.0)
+    assignments = np.argmax(vectors @ centroids.T, axis=1)
+    return centroids, assignments
@@ -0,0 +1,83 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+
+def estimate_tokens(message: Dict[str, Any]) -> int:
+    """Rough token count for a chat message (~4 characters per token plus role overhead)."""
+    content = message.get("content") or ""
+    if not isinstance(content, str):
+        content = str(content)
+    return len(content) // 4 + 4
+
+
+@dataclass
+class Conversation:
+    messages: List[Dict[str, Any]] = field(default_factory=list)
+    tokens: int = 0
+    last_access: float = field(default_factory=time.monotonic)
+
+
+class ConversationStore:
+    """
+    Message histories keyed by session id.
+
+    Each history is trimmed from the oldest end to stay within a token budget, so the
+    prompt we send per request stays flat. Idle sessions are evicted after a TTL and the
+    least recently used ones are dropped once there are more than `max_sessions`.
+    """
+
+    def __init__(self, token_budget: int = 3000, max_sessions: int = 1000, ttl_seconds: float = 3600):
+        self.token_budget = token_budget
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions: "OrderedDict[str, Conversation]" = OrderedDict()
+
+    def _get(self, session_id: str) -> Conversation:
+        conversation = self._sessions.get(session_id)
+        if conversation is None:
+            conversation = Conversation()
+            self._sessions[session_id] = conversation
+        else:
+            self._sessions.move_to_end(session_id)
+        conversation.last_access = time.monotonic()
+        self._evict()
+        return conversation
+
+    def _evict(self):
+        now = time.monotonic()
+        # Sessions are kept in access order, so we can stop at the first live one
+        while self._sessions:
+            _, oldest = next(iter(self._sessions.items()))
+            expired = now - oldest.last_access > self.ttl_seconds
+            if not expired and len(self._sessions) <= self.max_sessions:
+                break
+            self._sessions.popitem(last=False)
+
+    def _trim(self, conversation: Conversation):
+        messages = conversation.messages
+        # Drop the oldest messages until we fit
+        while conversation.tokens > self.token_budget and len(messages) > 1:
+            conversation.tokens -= estimate_tokens(messages.pop(0))
+        # Don't start the history on an assistant reply whose question was dropped, even if
+        # that empties it: a lone oversized turn is dropped as a whole
+        while messages and messages[0].get("role") != "user":
+            conversation.tokens -= estimate_tokens(messages.pop(0))
+
+    def history(self, session_id: str) -> List[Dict[str, Any]]:
+        """Return a copy of the session's (already trimmed) history."""
+        return list(self._get(session_id).messages)
+
+    def append(self, session_id: str, *messages: Dict[str, Any]):
+        conversation = self._get(session_id)
+        for message in messages:
+            conversation.messages.append(message)
+            conversation.tokens += estimate_tokens(message)
+        self._trim(conversation)
+
+    def reset(self, session_id: str):
+        self._sessions.pop(session_id, None)
+
+    def __len__(self):
+        return len(self._sessions)
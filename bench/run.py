@@ -0,0 +1,361 @@
+"""
+Offline load test for the GameDex API.
+
+Starts the upstream stand-ins (bench/stubs.py), builds a local vector index, then
+runs the real FastAPI app and MCP server against them and drives `/query/stream`
+with a weighted query mix at a fixed concurrency. Reports p50/p95/p99 latency for
+every stage of the answer stream plus throughput, and can save the run as a
+baseline or compare it with an earlier one.
+
+    python bench/run.py --concurrency 16 --requests 400 --save before
+    python bench/run.py --concurrency 16 --requests 400 --compare before
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from typing import Dict, List
+
+import httpx
+
+from stubs import GAMES, WORDS
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+BASELINE_DIR = os.path.join(BENCH_DIR, "baselines")
+
+# Stream milestones, measured from when the request was sent
+STAGES = ["classified", "igdb_done", "rag_done", "docs_done", "first_token", "total"]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    # Nearest-rank percentile
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    return {
+        "count": len(values),
+        "mean": sum(values) / len(values) if values else 0.0,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+    }
+
+
+def build_index(path: str, docs: int, model_name: str):
+    """Encode synthetic game descriptions with the real embedding model into a LocalRetriever index."""
+    sys.path.insert(0, os.path.join(REPO_DIR, "api"))
+    from retriever import LocalRetriever
+    from sentence_transformers import SentenceTransformer
+
+    rng = random.Random(0)
+    records = []
+    for i in range(docs):
+        game = GAMES[i % len(GAMES)]
+        text = (
+            f"{game['name']} is a {' / '.join(game['genres'])} game by {game['company']}. "
+            + " ".join(rng.choice(WORDS) for _ in range(40))
+        )
+        records.append({"id": f"doc-{i}", "metadata": {"text": text}})
+    model = SentenceTransformer(model_name)
+    vectors = model.encode([record["metadata"]["text"] for record in records], batch_size=64)
+    LocalRetriever.build(path, vectors, records, n_lists=max(1, int(docs ** 0.5)))
+
+
+def load_mix(path: str):
+    with open(path) as f:
+        mix = json.load(f)
+    kinds = list(mix)
+    weights = [mix[kind]["weight"] for kind in kinds]
+    return mix, kinds, weights
+
+
+def sample_queries(mix_path: str, count: int, seed: int):
+    mix, kinds, weights = load_mix(mix_path)
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        kind = rng.choices(kinds, weights)[0]
+        template = rng.choice(mix[kind]["queries"])
+        queries.append((kind, template.format(game=rng.choice(GAMES)["name"])))
+    return queries
+
+
+async def run_query(client: httpx.AsyncClient, api_url: str, kind: str, query: str):
+    result = {"kind": kind, "ok": False, "stages": {}}
+    start = time.perf_counter()
+    try:
+        async with client.stream(
+            "POST",
+            f"{api_url}/query/stream",
+            json={"query": query, "session_id": uuid.uuid4().hex},
+        ) as response:
+            if response.status_code != 200:
+                result["error"] = f"HTTP {response.status_code}"
+                return result
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                event = json.loads(line)
+                elapsed = (time.perf_counter() - start) * 1000
+                if event["type"] == "status":
+                    result["stages"].setdefault(event["stage"], elapsed)
+                elif event["type"] == "token":
+                    result["stages"].setdefault("first_token", elapsed)
+                elif event["type"] == "error":
+                    result["error"] = event.get("content")
+                elif event["type"] == "done":
+                    result["stages"]["total"] = elapsed
+                    result["ok"] = "error" not in result
+    except Exception as e:
+        result["error"] = str(e) or type(e).__name__
+    return result
+
+
+async def drive(api_url: str, queries, concurrency: int, warmup: int, timeout: float):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        for kind, query in queries[:warmup]:
+            await run_query(client, api_url, kind, query)
+
+        pending = asyncio.Queue()
+        for item in queries[warmup:]:
+            pending.put_nowait(item)
+        results = []
+
+        async def worker():
+            while not pending.empty():
+                kind, query = pending.get_nowait()
+                results.append(await run_query(client, api_url, kind, query))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall = time.perf_counter() - start
+
+        try:
+            stats = (await client.get(f"{api_url}/stats")).json()
+        except Exception:
+            stats = None
+    return results, wall, stats
+
+
+def report(results, wall: float, config: dict, stats) -> dict:
+    completed = [r for r in results if r["ok"]]
+    errors = {}
+    for r in results:
+        if not r["ok"]:
+            errors[r.get("error", "no done event")] = errors.get(r.get("error", "no done event"), 0) + 1
+    return {
+        "config": config,
+        "requests": len(results),
+        "completed": len(completed),
+        "errors": errors,
+        "wall_seconds": wall,
+        "throughput_rps": len(completed) / wall if wall else 0.0,
+        "stages": {
+            stage: summarize([r["stages"][stage] for r in completed if stage in r["stages"]])
+            for stage in STAGES
+        },
+        "by_kind": {
+            kind: summarize([r["stages"]["total"] for r in completed if r["kind"] == kind])
+            for kind in sorted({r["kind"] for r in results})
+        },
+        "server_stats": stats,
+    }
+
+
+def print_report(summary: dict, baseline: dict = None):
+    print(
+        f"\n{summary['completed']}/{summary['requests']} requests in {summary['wall_seconds']:.1f}s"
+        f" -> {summary['throughput_rps']:.2f} req/s"
+        + (f" (baseline {baseline['throughput_rps']:.2f})" if baseline else "")
+    )
+    for error, count in summary["errors"].items():
+        print(f"  {count} x {error}")
+
+    def rows(section):
+        for name, row in summary[section].items():
+            if not row["count"]:
+                continue
+            line = f"  {name:<12} n={row['count']:<5}" + "".join(
+                f" {key}={row[key]:8.1f}ms" for key in ("p50", "p95", "p99")
+            )
+            old = (baseline or {}).get(section, {}).get(name)
+            if old and old["count"]:
+                line += "  vs baseline" + "".join(
+                    f" {key} {(row[key] - old[key]) / old[key] * 100:+.0f}%" if old[key] else ""
+                    for key in ("p50", "p95", "p99")
+                )
+            print(line)
+
+    print("\nStage latency (from request start):")
+    rows("stages")
+    print("\nEnd-to-end latency by query kind:")
+    rows("by_kind")
+
+
+def wait_until(url: str, process: subprocess.Popen, timeout: float, name: str):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{name} exited with code {process.returncode}")
+        try:
+            if httpx.get(url, timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise TimeoutError(f"{name} did not come up within {timeout}s")
+
+
+def stop(process: subprocess.Popen):
+    if process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=5, help="Unmeasured requests sent first")
+    parser.add_argument("--mix", default=os.path.join(BENCH_DIR, "mixes", "default.json"))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout")
+    parser.add_argument("--api-url", help="Benchmark an API that is already running instead of starting one")
+    parser.add_argument("--api-port", type=int, default=8100)
+    parser.add_argument("--stub-port", type=int, default=9100)
+    parser.add_argument("--llm-ttft-ms", type=float, default=300)
+    parser.add_argument("--llm-tokens-per-second", type=float, default=250)
+    parser.add_argument("--llm-tokens", type=int, default=120, help="Tokens per streamed answer")
+    parser.add_argument("--upstream-latency-ms", type=float, default=80, help="Mean IGDB/Twitch/Serper latency")
+    parser.add_argument("--index-docs", type=int, default=2000)
+    parser.add_argument("--embedding-model", default=os.getenv("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2"))
+    parser.add_argument("--mcp-pool-size", type=int, default=2)
+    parser.add_argument("--save", metavar="NAME", help="Save the run as bench/baselines/NAME.json")
+    parser.add_argument("--compare", metavar="NAME", help="Compare with bench/baselines/NAME.json")
+    parser.add_argument("--keep-workdir", action="store_true")
+    parser.add_argument("--build-index", metavar="PATH", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.build_index:
+        build_index(args.build_index, args.index_docs, args.embedding_model)
+        return
+
+    config = {
+        key: value
+        for key, value in vars(args).items()
+        if key not in ("save", "compare", "keep_workdir", "build_index", "api_url", "api_port", "stub_port")
+    }
+    queries = sample_queries(args.mix, args.warmup + args.requests, args.seed)
+    processes = []
+    workdir = tempfile.mkdtemp(prefix="gamedex-bench-")
+    try:
+        api_url = args.api_url
+        if api_url is None:
+            stub_url = f"http://127.0.0.1:{args.stub_port}"
+            stub = subprocess.Popen(
+                [sys.executable, os.path.join(BENCH_DIR, "stubs.py"), "--port", str(args.stub_port)],
+                env={
+                    **os.environ,
+                    "STUB_LLM_TTFT_MS": str(args.llm_ttft_ms),
+                    "STUB_LLM_TOKENS_PER_SECOND": str(args.llm_tokens_per_second),
+                    "STUB_LLM_TOKENS": str(args.llm_tokens),
+                    "STUB_UPSTREAM_LATENCY_MS": str(args.upstream_latency_ms),
+                },
+            )
+            processes.append(stub)
+
+            print(f"Building a {args.index_docs}-document index in {workdir}...")
+            index_path = os.path.join(workdir, "index")
+            subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--build-index", index_path,
+                 "--index-docs", str(args.index_docs), "--embedding-model", args.embedding_model],
+                cwd=workdir,
+                check=True,
+            )
+            titles_path = os.path.join(workdir, "game_titles.txt")
+            with open(titles_path, "w") as f:
+                f.write("\n".join(game["name"] for game in GAMES) + "\n")
+            wait_until(f"{stub_url}/docs/0", stub, 30, "Stub server")
+
+            # Run from the scratch directory so no .env, logs or journals from the repo are used
+            api = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", os.path.join(REPO_DIR, "api"),
+                 "--host", "127.0.0.1", "--port", str(args.api_port), "--log-level", "warning"],
+                cwd=workdir,
+                env={
+                    **os.environ,
+                    "GROQ_API_KEY": "bench",
+                    "LLM_BASE_URL": stub_url,
+                    "EMBEDDING_MODEL_NAME": args.embedding_model,
+                    "RETRIEVER_BACKEND": "local",
+                    "LOCAL_INDEX_PATH": index_path,
+                    "ROUTER_TITLES_PATH": titles_path,
+                    "MCP_POOL_SIZE": str(args.mcp_pool_size),
+                    "SERVER_SCRIPT_PATH": os.path.join(REPO_DIR, "server", "main.py"),
+                    "TWITCH_CLIENT_ID": "bench",
+                    "TWITCH_CLIENT_SECRET": "bench",
+                    "IGDB_TOKEN_URL": f"{stub_url}/oauth2/token",
+                    "IGDB_GAMES_URL": f"{stub_url}/v4/games",
+                    "IGDB_MULTIQUERY_URL": f"{stub_url}/v4/multiquery",
+                    # The stand-in has no quota; measure the app, not the rate limiter
+                    "IGDB_REQUESTS_PER_SECOND": "10000",
+                    "IGDB_MAX_OPEN_REQUESTS": "10000",
+                    "SERPER_API_KEY": "bench",
+                    "SERPER_URL": f"{stub_url}/search",
+                    "DOCS_CACHE_PATH": os.path.join(workdir, "docs.sqlite3"),
+                    # Keep stand-in records out of the real catalog, and runs comparable
+                    "GAME_CATALOG_PATH": os.path.join(workdir, "games.sqlite3"),
+                },
+            )
+            processes.append(api)
+            api_url = f"http://127.0.0.1:{args.api_port}"
+            print("Waiting for the API to report ready...")
+            wait_until(f"{api_url}/ready", api, 600, "API")
+
+        print(f"Sending {args.requests} requests at concurrency {args.concurrency}...")
+        results, wall, stats = asyncio.run(
+            drive(api_url, queries, args.concurrency, args.warmup, args.timeout)
+        )
+    finally:
+        for process in reversed(processes):
+            stop(process)
+        if args.keep_workdir:
+            print(f"Scratch files kept in {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    summary = report(results, wall, config, stats)
+    baseline = None
+    if args.compare:
+        with open(os.path.join(BASELINE_DIR, f"{args.compare}.json")) as f:
+            baseline = json.load(f)
+    print_report(summary, baseline)
+
+    if args.save:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        path = os.path.join(BASELINE_DIR, f"{args.save}.json")
+        with open(path, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"\nSaved baseline to {path}")
+
+
+if __name__ == "__main__":
+    main()
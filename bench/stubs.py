@@ -0,0 +1,200 @@
+"""
+Local stand-ins for every upstream the app talks to, so benchmarks cost no quota:
+
+- Groq chat completions (`/openai/v1/chat/completions`), streaming and not, with
+  configurable time to first token and token rate
+- Twitch OAuth (`/oauth2/token`) and IGDB (`/v4/games`, `/v4/multiquery`)
+- Serper (`/search`) plus static documentation pages (`/docs/{page}`)
+
+Run with `python bench/stubs.py --port 9000`; `bench/run.py` starts it for you.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import time
+import uuid
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import StreamingResponse
+
+# Titles the IGDB stand-in knows about; bench/run.py also uses them for the router and the index
+GAMES = [
+    {"name": "The Witcher 3: Wild Hunt", "genres": ["RPG", "Adventure"], "company": "CD Projekt Red"},
+    {"name": "God of War", "genres": ["Action", "Adventure"], "company": "Santa Monica Studio"},
+    {"name": "Hollow Knight", "genres": ["Platform", "Metroidvania"], "company": "Team Cherry"},
+    {"name": "Stardew Valley", "genres": ["Simulation", "RPG"], "company": "ConcernedApe"},
+    {"name": "Elden Ring", "genres": ["RPG", "Action"], "company": "FromSoftware"},
+    {"name": "Hades", "genres": ["Roguelike", "Action"], "company": "Supergiant Games"},
+    {"name": "Celeste", "genres": ["Platform", "Indie"], "company": "Maddy Makes Games"},
+    {"name": "Portal 2", "genres": ["Puzzle"], "company": "Valve"},
+    {"name": "Red Dead Redemption 2", "genres": ["Action", "Adventure"], "company": "Rockstar Games"},
+    {"name": "Disco Elysium", "genres": ["RPG"], "company": "ZA/UM"},
+    {"name": "Minecraft", "genres": ["Sandbox", "Survival"], "company": "Mojang"},
+    {"name": "Terraria", "genres": ["Sandbox", "Action"], "company": "Re-Logic"},
+]
+
+WORDS = (
+    "the game offers a rich world full of quests combat exploration and story with memorable "
+    "characters challenging bosses and plenty of secrets to uncover along the way"
+).split()
+
+LLM_TTFT = float(os.getenv("STUB_LLM_TTFT_MS", "300")) / 1000
+LLM_TOKENS_PER_SECOND = float(os.getenv("STUB_LLM_TOKENS_PER_SECOND", "250"))
+LLM_TOKENS = int(os.getenv("STUB_LLM_TOKENS", "120"))
+UPSTREAM_LATENCY = float(os.getenv("STUB_UPSTREAM_LATENCY_MS", "80")) / 1000
+
+app = FastAPI()
+
+
+async def upstream_delay():
+    # Some jitter so percentiles aren't all the same number
+    await asyncio.sleep(UPSTREAM_LATENCY * random.uniform(0.5, 1.5))
+
+
+def find_game(text: str):
+    text = text.lower()
+    for game in GAMES:
+        if game["name"].lower() in text or game["name"].split(":")[0].lower() in text:
+            return game
+    return None
+
+
+def completion_text(messages) -> str:
+    system = next((m["content"] for m in messages if m.get("role") == "system"), "")
+    query = messages[-1].get("content", "") if messages else ""
+    if "assistant router" in system:
+        game = find_game(query)
+        if game:
+            return json.dumps({"action": "game_info", "game_name": game["name"], "user_friendly_response": ""})
+        library = next((name for name in ("langchain", "llama-index", "openai") if name in query.lower()), None)
+        if library:
+            return json.dumps({"action": "get_docs", "query": query, "library": library, "user_friendly_response": ""})
+        return json.dumps({"action": "general", "user_friendly_response": ""})
+    return " ".join(random.choice(WORDS) for _ in range(LLM_TOKENS))
+
+
+@app.post("/openai/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    text = completion_text(body.get("messages", []))
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    created = int(time.time())
+    model = body.get("model", "stub")
+
+    if not body.get("stream"):
+        await asyncio.sleep(LLM_TTFT + len(text.split()) / LLM_TOKENS_PER_SECOND)
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [
+                {"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}
+            ],
+            "usage": {"prompt_tokens": 0, "completion_tokens": len(text.split()), "total_tokens": 0},
+        }
+
+    async def events():
+        await asyncio.sleep(LLM_TTFT)
+        for index, word in enumerate(text.split()):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [
+                    {"index": 0, "delta": {"content": word if index == 0 else " " + word}, "finish_reason": None}
+                ],
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+            await asyncio.sleep(1 / LLM_TOKENS_PER_SECOND)
+        done = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+        }
+        yield f"data: {json.dumps(done)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.post("/oauth2/token")
+async def twitch_token():
+    await upstream_delay()
+    return {"access_token": uuid.uuid4().hex, "expires_in": 3600, "token_type": "bearer"}
+
+
+@app.post("/v4/games")
+async def igdb_games(request: Request):
+    await upstream_delay()
+    game = find_game((await request.body()).decode())
+    if game is None:
+        return []
+    return [game_record(game)]
+
+
+def game_record(game: dict) -> dict:
+    return {
+        "name": game["name"],
+        "first_release_date": 1431993600,
+        "genres": [{"name": genre} for genre in game["genres"]],
+        "involved_companies": [{"company": {"name": game["company"]}}],
+        "rating": 90.0,
+        "storyline": f"The story of {game['name']}. " + " ".join(WORDS),
+        "similar_games": [{"name": other["name"]} for other in GAMES if other is not game][:3],
+    }
+
+
+@app.post("/v4/multiquery")
+async def igdb_multiquery(request: Request):
+    await upstream_delay()
+    body = (await request.body()).decode()
+    results = []
+    for name, search in re.findall(r'query games "([^"]+)" \{ search "([^"]*)"', body):
+        game = find_game(search)
+        results.append({"name": name, "result": [game_record(game)] if game else []})
+    return results
+
+
+@app.post("/search")
+async def serper_search(request: Request):
+    await upstream_delay()
+    query = (await request.json()).get("q", "")
+    base = str(request.base_url).rstrip("/")
+    return {
+        "organic": [
+            {"title": f"Docs page {page}", "link": f"{base}/docs/{page}?q={len(query)}"}
+            for page in range(2)
+        ]
+    }
+
+
+@app.get("/docs/{page}")
+async def docs_page(page: int, request: Request):
+    etag = f'"docs-{page}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    await upstream_delay()
+    sections = "".join(
+        f"<h2>Section {i}</h2><p>{' '.join(random.sample(WORDS, 12))} streaming api example {i}.</p>"
+        for i in range(40)
+    )
+    html = f"<html><body><nav>menu</nav><main><h1>Docs page {page}</h1>{sections}</main></body></html>"
+    return Response(html, media_type="text/html", headers={"ETag": etag})
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run the upstream stand-ins")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
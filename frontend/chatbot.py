@@ -2,6 +2,44 @@ import streamlit as st
 import httpx
 from typing import Dict, Any
 import json
+import uuid
+
+
+@st.cache_resource
+def get_http_client() -> httpx.Client:
+    """One keep-alive HTTP client shared by every rerun and session."""
+    return httpx.Client(timeout=30.0, verify=False)
+
+
+@st.cache_resource
+def tool_catalog_cache() -> Dict[str, Any]:
+    """Last tool catalog seen from the API, with its ETag for revalidation."""
+    return {"etag": None, "tools": []}
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def fetch_tools(api_url: str):
+    cache = tool_catalog_cache()
+    headers = {"If-None-Match": cache["etag"]} if cache["etag"] else {}
+    response = get_http_client().get(f"{api_url}/tools", headers=headers)
+    if response.status_code == 304:
+        return cache["tools"]
+    response.raise_for_status()
+    cache["etag"] = response.headers.get("etag")
+    cache["tools"] = response.json()["tools"]
+    return cache["tools"]
+
+
+# How many messages to render per page of chat history
+HISTORY_WINDOW = 20
+
+STAGE_LABELS = {
+    "classified": "🧭 Understood the question...",
+    "answer_cached": "⚡ Found a recent answer...",
+    "igdb_done": "🎮 Got IGDB info...",
+    "rag_done": "📚 Searched the game database...",
+    "docs_done": "📖 Read the documentation...",
+}
 
 
 class Chatbot:
@@ -9,6 +47,22 @@ class Chatbot:
         self.api_url = api_url
         self.current_tool_call = {"name": None, "args": None}
         self.messages = st.session_state.get("messages", [])
+        self.session_id = st.session_state.get("session_id", "default")
+        self.parsed = st.session_state.setdefault("parsed_messages", {})
+
+    def parse_tool_result(self, message_id, index: int, item: Dict[str, Any]):
+        """Parsed JSON payload of a tool result, cached by message id across reruns."""
+        key = (message_id, index)
+        if message_id is not None and key in self.parsed:
+            return self.parsed[key]
+        data = item.get("content", [])
+        if data and isinstance(data[0], dict):
+            parsed = json.loads(data[0].get("text", ""))
+        else:
+            parsed = None
+        if message_id is not None:
+            self.parsed[key] = parsed
+        return parsed
 
     def display_message(self, message: Dict[str, Any]):
         if not isinstance(message, dict):
@@ -23,7 +77,7 @@ class Chatbot:
             if isinstance(content, str):
                 st.chat_message("user").markdown(content)
             elif isinstance(content, list):
-                for item in content:
+                for index, item in enumerate(content):
                     if not isinstance(item, dict):
                         st.warning(f"⚠️ Invalid user content item: {item}")
                         continue
@@ -33,10 +87,8 @@ class Chatbot:
                         with st.chat_message("assistant"):
                             st.write(f"Tool result from: {self.current_tool_call['name']}")
                             try:
-                                data = item.get("content", [])
-                                if data and isinstance(data[0], dict):
-                                    text = data[0].get("text", "")
-                                    parsed = json.loads(text)
+                                parsed = self.parse_tool_result(message.get("id"), index, item)
+                                if parsed is not None:
                                     st.json({
                                         "name": self.current_tool_call["name"],
                                         "args": self.current_tool_call["args"],
@@ -68,12 +120,49 @@ class Chatbot:
             st.warning(f"⚠️ Unknown message format: {message}")
 
     async def get_tools(self):
-        async with httpx.AsyncClient(timeout=30.0, verify=False) as client:
-            response = await client.get(
-                f"{self.api_url}/tools",
-                headers={"Content-Type": "application/json"},
-            )
-            return response.json()
+        return {"tools": fetch_tools(self.api_url)}
+
+    async def stream_query(self, query: str):
+        # A new turn goes back to showing only the latest page of history
+        st.session_state["history_window"] = HISTORY_WINDOW
+        st.chat_message("user").markdown(query)
+        with st.chat_message("assistant"):
+            status = st.status("Thinking...", expanded=False)
+            placeholder = st.empty()
+            reply = ""
+            try:
+                async with httpx.AsyncClient(timeout=60.0, verify=False) as client:
+                    async with client.stream(
+                        "POST",
+                        f"{self.api_url}/query/stream",
+                        json={"query": query, "session_id": self.session_id},
+                        headers={"Content-Type": "application/json"},
+                    ) as response:
+                        if response.status_code != 200:
+                            status.update(label="Failed", state="error")
+                            st.error(f"⚠️ API Error: {response.status_code}")
+                            return
+
+                        async for line in response.aiter_lines():
+                            if not line:
+                                continue
+                            event = json.loads(line)
+                            if event.get("type") == "status":
+                                status.update(label=STAGE_LABELS.get(event.get("stage"), event.get("stage")))
+                            elif event.get("type") in ("token", "error"):
+                                reply += event.get("content", "")
+                                placeholder.markdown(reply + "▌")
+                            elif event.get("type") == "done":
+                                placeholder.markdown(reply)
+                                status.update(label="Done", state="complete")
+                                if isinstance(event.get("messages"), list):
+                                    for message in event["messages"]:
+                                        if isinstance(message, dict):
+                                            message.setdefault("id", uuid.uuid4().hex)
+                                    st.session_state["messages"] += event["messages"]
+            except Exception as e:
+                status.update(label="Failed", state="error")
+                st.error(f"Frontend: Error processing query: {str(e)}")
 
     async def render(self):
         st.title("🎮 GameDex")
@@ -84,11 +173,16 @@ class Chatbot:
 
             if st.button("🧹 Clear Chat"):
                 try:
-                    async with httpx.AsyncClient(timeout=10.0, verify=False) as client:
-                        await client.post(f"{self.api_url}/reset")
+                    get_http_client().post(
+                        f"{self.api_url}/reset",
+                        json={"session_id": self.session_id},
+                        timeout=10.0,
+                    )
 
                     # Clear frontend memory
                     st.session_state["messages"] = []
+                    st.session_state["parsed_messages"] = {}
+                    st.session_state["history_window"] = HISTORY_WINDOW
                     self.messages = []
                     st.rerun()
                 except Exception as e:
@@ -104,35 +198,20 @@ class Chatbot:
         # Chat input must be placed first to capture query before rerender
         query = st.chat_input("Enter your query here")
 
-        if query:
-            async with httpx.AsyncClient(timeout=60.0, verify=False) as client:
-                try:
-                    response = await client.post(
-                        f"{self.api_url}/query",
-                        json={"query": query},
-                        headers={"Content-Type": "application/json"},
-                    )
-                    if response.status_code == 200:
-                        data = response.json()
-
-                        # Append new messages properly
-                        if isinstance(data, dict) and isinstance(data.get("messages"), list):
-                            st.session_state["messages"] += data["messages"]
-                        elif isinstance(data, list):
-                            st.session_state["messages"] += data
-                        else:
-                            st.error("⚠️ Unexpected response format.")
-                            st.json(data)
-                    else:
-                        st.error(f"⚠️ API Error: {response.status_code}")
-                except Exception as e:
-                    st.error(f"Frontend: Error processing query: {str(e)}")
-
-        # Always render current session messages
+        # Render only the latest window of messages so reruns cost the same in long chats
         self.messages = st.session_state.get("messages", [])
-        for message in self.messages:
+        window = st.session_state.get("history_window", HISTORY_WINDOW)
+        hidden = len(self.messages) - window
+        if hidden > 0 and st.button(f"⬆️ Load earlier messages ({hidden} hidden)"):
+            st.session_state["history_window"] = window + HISTORY_WINDOW
+            st.rerun()
+        for message in self.messages[-window:]:
             self.display_message(message)
 
+        # Stream the new turn below the history, then keep it in session state
+        if query:
+            await self.stream_query(query)
+
 
 
 
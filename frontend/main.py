@@ -1,4 +1,5 @@
 import asyncio
+import uuid
 from utils.logger import logger
 import streamlit as st
 from chatbot import Chatbot
@@ -13,6 +14,12 @@ async def main():
         
     if "messages" not in st.session_state:
         st.session_state["messages"] = []
+
+    if "parsed_messages" not in st.session_state:
+        st.session_state["parsed_messages"] = {}
+
+    if "session_id" not in st.session_state:
+        st.session_state["session_id"] = str(uuid.uuid4())
         
     API_URL = "http://localhost:8000"
 
@@ -0,0 +1,371 @@
+"""
+Persistent catalog of game records, the read-through layer in front of IGDB.
+
+Records are stored in the shape IGDB returns them (name, genres, involved_companies,
+similar_games, ...), so `format_game` renders them whichever way they got here. Names
+are indexed with an FTS5 trigram index, which lets misspelled or partial names
+resolve locally. IGDB results are written back as they're fetched. The catalog can
+also be pre-seeded from a dump:
+
+    python game_catalog.py import-igdb games.jsonl     # IGDB API records with expanded fields, JSON lines or array
+    python game_catalog.py import-steam games.csv      # Steam dataset, CSV or JSON
+"""
+
+import argparse
+import csv
+import difflib
+import html
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger("docs-server")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    record TEXT NOT NULL,
+    source TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS aliases (
+    alias TEXT PRIMARY KEY,
+    game_id INTEGER NOT NULL REFERENCES games (id) ON DELETE CASCADE
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS games_fts USING fts5(
+    key, content='games', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS games_ai AFTER INSERT ON games BEGIN
+    INSERT INTO games_fts (rowid, key) VALUES (new.id, new.key);
+END;
+CREATE TRIGGER IF NOT EXISTS games_ad AFTER DELETE ON games BEGIN
+    INSERT INTO games_fts (games_fts, rowid, key) VALUES ('delete', old.id, old.key);
+END;
+CREATE TRIGGER IF NOT EXISTS games_au AFTER UPDATE OF key ON games BEGIN
+    INSERT INTO games_fts (games_fts, rowid, key) VALUES ('delete', old.id, old.key);
+    INSERT INTO games_fts (rowid, key) VALUES (new.id, new.key);
+END;
+"""
+
+# Records from IGDB take precedence over ones derived from other sources
+SOURCE_PRIORITY = {"steam": 0, "igdb": 1}
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_NUMBER = re.compile(r"\b(?:\d+|x{0,3}(?:ix|iv|v?i{0,3}))\b")
+_ROMAN = {"i": 1, "v": 5, "x": 10}
+_TAG = re.compile(r"<[^>]+>")
+
+
+def catalog_key(name: str) -> str:
+    """Lowercased name with punctuation dropped, so "Witcher 3: Wild Hunt" == "witcher 3 wild hunt"."""
+    return " ".join(_PUNCTUATION.sub(" ", name.lower()).split())
+
+
+def sequel_numbers(key: str) -> List[int]:
+    """The numbers in a normalized name, Roman numerals included: "final fantasy xii" -> [12]."""
+    numbers = []
+    for token in filter(None, _NUMBER.findall(key)):
+        if token.isdigit():
+            numbers.append(int(token))
+            continue
+        values = [_ROMAN[c] for c in token]
+        numbers.append(sum(-v if v < after else v for v, after in zip(values, values[1:] + [0])))
+    return numbers
+
+
+def _trigram_query(key: str) -> Optional[str]:
+    # OR of the name's trigrams: candidates only need some overlap, difflib does the ranking
+    trigrams = dict.fromkeys(key[i : i + 3] for i in range(len(key) - 2))
+    terms = ['"' + trigram.replace('"', '""') + '"' for trigram in trigrams if trigram.strip()]
+    return " OR ".join(terms) or None
+
+
+class GameCatalog:
+    """
+    SQLite store of game records, looked up by exact name, by a name IGDB previously
+    resolved (an alias), or fuzzily through the trigram index.
+
+    A fuzzy match must score at least `min_similarity` (difflib ratio of the
+    normalized names) and contain the same numbers as the query, Roman numerals
+    included, so "Portal 3" doesn't resolve to "Portal 2" nor "Dark Souls II" to
+    "Dark Souls III". Records older than `max_age` seconds are not
+    served by `find` unless it's asked for stale ones.
+
+    All methods are blocking; call them through `asyncio.to_thread`.
+    """
+
+    def __init__(self, path: str, min_similarity: float = 0.85, max_age: float = 30 * 86400, candidates: int = 20):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.min_similarity = min_similarity
+        self.max_age = max_age
+        self.candidates = candidates
+        self.counts = {"exact_hits": 0, "alias_hits": 0, "fuzzy_hits": 0, "misses": 0, "writes": 0}
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA foreign_keys=ON")
+        self._db.executescript(SCHEMA)
+
+    def find(self, name: str, allow_stale: bool = False) -> Optional[Dict[str, Any]]:
+        """The catalog record for `name`, or None if it isn't known (or only known stale)."""
+        key = catalog_key(name)
+        if not key:
+            return None
+        oldest = 0.0 if allow_stale else time.time() - self.max_age
+        with self._lock:
+            row = self._db.execute(
+                "SELECT record, updated_at FROM games WHERE key = ?", (key,)
+            ).fetchone()
+            counter = "exact_hits"
+            if row is None:
+                row = self._db.execute(
+                    "SELECT g.record, g.updated_at FROM aliases a JOIN games g ON g.id = a.game_id WHERE a.alias = ?",
+                    (key,),
+                ).fetchone()
+                counter = "alias_hits"
+            if row is None:
+                row = self._fuzzy(key)
+                counter = "fuzzy_hits"
+            if row is None or row[1] < oldest:
+                self.counts["misses"] += 1
+                return None
+            self.counts[counter] += 1
+        return json.loads(row[0])
+
+    def _fuzzy(self, key: str):
+        query = _trigram_query(key)
+        if query is None:
+            return None
+        rows = self._db.execute(
+            "SELECT g.key, g.record, g.updated_at FROM games_fts f JOIN games g ON g.id = f.rowid "
+            "WHERE games_fts MATCH ? ORDER BY f.rank LIMIT ?",
+            (query, self.candidates),
+        ).fetchall()
+        numbers = sequel_numbers(key)
+        best, best_score = None, self.min_similarity
+        for candidate, record, updated_at in rows:
+            if sequel_numbers(candidate) != numbers:
+                continue
+            # Compare without a leading article too: "witcher 3" vs "the witcher 3"
+            score = max(
+                difflib.SequenceMatcher(None, key, candidate).ratio(),
+                difflib.SequenceMatcher(None, key, candidate.removeprefix("the ")).ratio(),
+            )
+            if score >= best_score:
+                best, best_score = (record, updated_at), score
+        return best
+
+    def put(self, record: Dict[str, Any], source: str = "igdb", alias: Optional[str] = None):
+        """Store a record, keeping the existing one if it came from a better source."""
+        self.put_many([record], source, {0: alias} if alias else None)
+
+    def put_many(
+        self, records: List[Dict[str, Any]], source: str, aliases: Optional[Dict[int, str]] = None
+    ) -> int:
+        """
+        Store records in one transaction. `aliases` maps a record's position to the
+        query that resolved to it. Returns how many records were written.
+        """
+        written = 0
+        now = time.time()
+        priority = SOURCE_PRIORITY.get(source, 0)
+        with self._lock, self._db:
+            for position, record in enumerate(records):
+                key = catalog_key(record.get("name") or "")
+                if not key:
+                    continue
+                existing = self._db.execute("SELECT id, source FROM games WHERE key = ?", (key,)).fetchone()
+                if existing is not None and SOURCE_PRIORITY.get(existing[1], 0) > priority:
+                    game_id = existing[0]
+                else:
+                    self._db.execute(
+                        "INSERT INTO games (key, name, record, source, updated_at) VALUES (?, ?, ?, ?, ?) "
+                        "ON CONFLICT (key) DO UPDATE SET name = excluded.name, record = excluded.record, "
+                        "source = excluded.source, updated_at = excluded.updated_at",
+                        (key, record["name"], json.dumps(record), source, now),
+                    )
+                    (game_id,) = self._db.execute("SELECT id FROM games WHERE key = ?", (key,)).fetchone()
+                    written += 1
+                alias = catalog_key((aliases or {}).get(position) or "")
+                if alias and alias != key:
+                    self._db.execute("INSERT OR REPLACE INTO aliases VALUES (?, ?)", (alias, game_id))
+            self.counts["writes"] += written
+        return written
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            (games,) = self._db.execute("SELECT COUNT(*) FROM games").fetchone()
+            (aliases,) = self._db.execute("SELECT COUNT(*) FROM aliases").fetchone()
+        return {"games": games, "aliases": aliases, **self.counts}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+# ---------------- Bulk import ----------------
+
+
+def read_json_records(path: str) -> Iterator[Dict[str, Any]]:
+    """JSON lines, a JSON array, a single record, or a JSON object of records keyed by id."""
+    with open(path, encoding="utf-8") as f:
+        if not path.endswith(".jsonl"):
+            try:
+                data = json.load(f)
+            except json.JSONDecodeError:
+                # JSON lines under a .json name
+                f.seek(0)
+            else:
+                if isinstance(data, dict) and "name" not in data:
+                    yield from ({"id": key, **value} for key, value in data.items())
+                else:
+                    yield from data if isinstance(data, list) else [data]
+                return
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def read_steam_rows(path: str) -> Iterator[Dict[str, Any]]:
+    if path.endswith(".csv"):
+        with open(path, encoding="utf-8", newline="") as f:
+            yield from csv.DictReader(f)
+    else:
+        yield from read_json_records(path)
+
+
+# Nested fields format_game reads, and the keys leading to the name inside each item
+EXPANDED_FIELDS = {"genres": ("name",), "involved_companies": ("company", "name"), "similar_games": ("name",)}
+
+
+def igdb_record(record: Any) -> Optional[Dict[str, Any]]:
+    """
+    The record if it has the shape `format_game` expects, else None. Raw IGDB dumps
+    and API results fetched without expanded fields hold genres, companies and
+    similar games as integer ids, which can't be rendered.
+    """
+    if not isinstance(record, dict) or not isinstance(record.get("name"), str):
+        return None
+    for field, path in EXPANDED_FIELDS.items():
+        items = record.get(field)
+        if items is None:
+            continue
+        if not isinstance(items, list):
+            return None
+        for item in items:
+            for key in path:
+                if not isinstance(item, dict) or key not in item:
+                    return None
+                item = item[key]
+    if record.get("rating") is not None and not isinstance(record["rating"], (int, float)):
+        return None
+    return record
+
+
+def _field(row: Dict[str, Any], *names: str) -> Any:
+    for name in names:
+        value = row.get(name)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def _names(value: Any) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return [str(item).strip() for item in value if str(item).strip()]
+    return [item.strip() for item in str(value).split(",") if item.strip()]
+
+
+def steam_record(row: Dict[str, Any], max_storyline_chars: int = 1500) -> Optional[Dict[str, Any]]:
+    """An IGDB-shaped record from a Steam dataset row (CSV columns or the JSON export's keys)."""
+    name = _field(row, "Name", "name")
+    if not name:
+        return None
+    record: Dict[str, Any] = {"name": str(name).strip()}
+    released = _field(row, "Release date", "release_date")
+    if released:
+        record["first_release_date"] = released
+    genres = _names(_field(row, "Genres", "genres"))
+    if genres:
+        record["genres"] = [{"name": genre} for genre in genres]
+    developers = _names(_field(row, "Developers", "developers"))
+    if developers:
+        record["involved_companies"] = [{"company": {"name": developer}} for developer in developers]
+    score = _field(row, "Metacritic score", "metacritic_score")
+    try:
+        if score is not None and float(score) > 0:
+            record["rating"] = float(score)
+    except ValueError:
+        pass
+    about = _field(row, "About the game", "about_the_game", "short_description")
+    if about:
+        text = " ".join(html.unescape(_TAG.sub(" ", str(about))).split())
+        record["storyline"] = text[:max_storyline_chars]
+    return record
+
+
+def import_records(catalog: GameCatalog, records: Iterable[Optional[Dict[str, Any]]], source: str, batch_size: int = 1000):
+    started = time.perf_counter()
+    batch: List[Dict[str, Any]] = []
+    seen = written = skipped = 0
+    for record in records:
+        if record is None or not record.get("name"):
+            skipped += 1
+            continue
+        seen += 1
+        batch.append(record)
+        if len(batch) >= batch_size:
+            written += catalog.put_many(batch, source)
+            batch = []
+            logger.info(f"Imported {written} of {seen} records")
+    if batch:
+        written += catalog.put_many(batch, source)
+    logger.info(f"Imported {written} of {seen} {source} records in {time.perf_counter() - started:.1f}s")
+    if skipped:
+        logger.warning(f"Skipped {skipped} records without a name or with fields in an unexpected shape")
+    return written
+
+
+def default_path() -> str:
+    return os.getenv(
+        "GAME_CATALOG_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "games.sqlite3")
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default=default_path(), help="Catalog file (default: $GAME_CATALOG_PATH)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    igdb = commands.add_parser(
+        "import-igdb", help="Import IGDB game records with genres, companies and similar games expanded"
+    )
+    igdb.add_argument("dump")
+    steam = commands.add_parser("import-steam", help="Import the Steam dataset; existing IGDB records are kept")
+    steam.add_argument("dataset")
+    commands.add_parser("stats", help="Show record counts")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    catalog = GameCatalog(args.path)
+    try:
+        if args.command == "import-igdb":
+            import_records(catalog, (igdb_record(record) for record in read_json_records(args.dump)), "igdb")
+        elif args.command == "import-steam":
+            import_records(catalog, (steam_record(row) for row in read_steam_rows(args.dataset)), "steam")
+        print(json.dumps(catalog.snapshot()))
+    finally:
+        catalog.close()
+
+
+if __name__ == "__main__":
+    main()
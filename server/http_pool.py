@@ -0,0 +1,90 @@
+import logging
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import httpx
+
+logger = logging.getLogger("docs-server")
+
+try:
+    import h2  # noqa: F401
+
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+@dataclass
+class UpstreamStats:
+    requests: int = 0
+    connections_opened: int = 0
+
+    def snapshot(self):
+        return {
+            "requests": self.requests,
+            "connections_opened": self.connections_opened,
+            "connections_reused": max(self.requests - self.connections_opened, 0),
+        }
+
+
+class HTTPPool:
+    """
+    Long-lived httpx clients, one per upstream, shared by every tool call.
+
+    Keeping the clients open lets requests reuse pooled keep-alive (and, when `h2` is
+    installed, multiplexed HTTP/2) connections instead of paying a TCP+TLS handshake
+    on every call. Each client counts requests and newly opened connections.
+    """
+
+    def __init__(
+        self,
+        http2: bool = True,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 60.0,
+        timeout: float = 30.0,
+    ):
+        if http2 and not HTTP2_AVAILABLE:
+            logger.warning("h2 is not installed, falling back to HTTP/1.1 (pip install 'httpx[http2]')")
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = timeout
+        self.stats: Dict[str, UpstreamStats] = {}
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+
+    def client(self, upstream: str, base_url: Optional[str] = None) -> httpx.AsyncClient:
+        """Get (or create) the shared client for an upstream."""
+        client = self._clients.get(upstream)
+        if client is None or client.is_closed:
+            stats = self.stats.setdefault(upstream, UpstreamStats())
+
+            async def trace(event_name: str, info: dict):
+                if event_name == "connection.connect_tcp.complete":
+                    stats.connections_opened += 1
+
+            async def on_request(request: httpx.Request):
+                stats.requests += 1
+                request.extensions["trace"] = trace
+
+            client = httpx.AsyncClient(
+                base_url=base_url or "",
+                http2=self.http2,
+                limits=self.limits,
+                timeout=self.timeout,
+                event_hooks={"request": [on_request]},
+            )
+            self._clients[upstream] = client
+        return client
+
+    def snapshot(self):
+        return {upstream: stats.snapshot() for upstream, stats in self.stats.items()}
+
+    async def aclose(self):
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+        logger.info(f"HTTP pool closed: {self.snapshot()}")
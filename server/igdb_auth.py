@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Optional
+
+import httpx
+
+logger = logging.getLogger("docs-server")
+
+
+class IGDBTokenManager:
+    """
+    Twitch app-access token for IGDB, refreshed before it expires.
+
+    A background task renews the token `refresh_margin` seconds ahead of `expires_in`,
+    so request paths normally find a valid token. Only one refresh runs at a time;
+    concurrent callers that need a token wait on it. `post` sends an authorized IGDB
+    request and retries once with a fresh token if IGDB answers 401.
+    """
+
+    def __init__(
+        self,
+        client_id: Optional[str],
+        client_secret: Optional[str],
+        token_url: str,
+        client: Callable[[], httpx.AsyncClient],
+        refresh_margin: float = 300,
+    ):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.token_url = token_url
+        self.client = client
+        self.refresh_margin = refresh_margin
+        self.refreshes = 0
+        self._token: Optional[str] = None
+        self._expires_at = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._background: Optional[asyncio.Task] = None
+
+    def _is_fresh(self) -> bool:
+        return self._token is not None and time.monotonic() < self._expires_at - self.refresh_margin
+
+    async def get_token(self) -> str:
+        if self._is_fresh():
+            return self._token
+        return await self._refresh()
+
+    def _refresh(self) -> Awaitable[str]:
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._fetch_token())
+        # shield: a cancelled caller shouldn't abort the refresh everyone else is waiting on
+        return asyncio.shield(self._refresh_task)
+
+    async def _fetch_token(self) -> str:
+        response = await self.client().post(
+            self.token_url,
+            params={
+                "client_id": self.client_id,
+                "client_secret": self.client_secret,
+                "grant_type": "client_credentials",
+            },
+            timeout=15,
+        )
+        response.raise_for_status()
+        data = response.json()
+        self._token = data["access_token"]
+        self._expires_at = time.monotonic() + float(data.get("expires_in", 3600))
+        self.refreshes += 1
+        logger.info(f"Refreshed IGDB token, expires in {data.get('expires_in')}s")
+        return self._token
+
+    async def _refresh_loop(self):
+        while True:
+            try:
+                await self._refresh()
+                delay = self._expires_at - self.refresh_margin - time.monotonic()
+            except Exception as e:
+                logger.warning(f"Background IGDB token refresh failed: {e}")
+                delay = 30
+            await asyncio.sleep(max(delay, 1))
+
+    def start(self):
+        if self._background is None and self.client_id and self.client_secret:
+            self._background = asyncio.create_task(self._refresh_loop())
+
+    async def aclose(self):
+        if self._background is not None:
+            self._background.cancel()
+            try:
+                await self._background
+            except asyncio.CancelledError:
+                pass
+            self._background = None
+
+    async def post(self, url: str, igdb_client: httpx.AsyncClient, **kwargs) -> httpx.Response:
+        """POST to IGDB with auth headers, retrying once on 401 with a new token."""
+        extra_headers = kwargs.pop("headers", {})
+        for attempt in range(2):
+            token = await self.get_token()
+            headers = {
+                **extra_headers,
+                "Client-ID": self.client_id,
+                "Authorization": f"Bearer {token}",
+            }
+            response = await igdb_client.post(url, headers=headers, **kwargs)
+            if response.status_code != 401 or attempt == 1:
+                break
+            logger.info("IGDB rejected the token, refreshing and retrying")
+            # Unless another caller already replaced it, force the next get_token to refresh
+            if self._token == token:
+                self._token = None
+        response.raise_for_status()
+        return response
@@ -1,15 +1,68 @@
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import Context, FastMCP
+from contextlib import asynccontextmanager
+import asyncio
 from dotenv import load_dotenv
 import httpx
 import json
+import logging
 import os
-from bs4 import BeautifulSoup
+import time
+from game_catalog import GameCatalog, default_path
+from http_pool import HTTPPool
+from igdb_auth import IGDBTokenManager
+from page_cache import PageCache
+from page_text import extract_main_text, rank_chunks, split_chunks
+from rate_limit import RateLimiter
+from response_cache import ResponseCache
+from timing import SpanTimings, trace_id_of
 load_dotenv()
 
-mcp = FastMCP("docs")
+logger = logging.getLogger("docs-server")
+
+# One pooled client per upstream, shared by all tool calls for the life of the server
+http_pool = HTTPPool(
+    http2=os.getenv("HTTP2", "1") == "1",
+    max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "20")),
+    max_keepalive_connections=int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "10")),
+    keepalive_expiry=float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60")),
+)
+# Per-tool and per-stage latency, merged into the API's /metrics
+timings = SpanTimings()
+
+
+@asynccontextmanager
+async def lifespan(server: FastMCP):
+    for upstream in ("twitch", "igdb", "serper", "docs"):
+        http_pool.client(upstream)
+    # Fetch the IGDB token up front and keep it renewed ahead of expiry
+    igdb_tokens.start()
+    try:
+        yield
+    finally:
+        await igdb_tokens.aclose()
+        await http_pool.aclose()
+        page_cache.close()
+        game_catalog.close()
+
+
+mcp = FastMCP("docs", lifespan=lifespan)
 
 USER_AGENT = "docs-app/1.0"
-SERPER_URL = "https://google.serper.dev/search"
+SERPER_URL = os.getenv("SERPER_URL", "https://google.serper.dev/search")
+
+# get_docs limits: bytes read per page, characters per chunk, characters returned
+DOCS_MAX_PAGE_BYTES = int(os.getenv("DOCS_MAX_PAGE_BYTES", str(2 * 1024 * 1024)))
+DOCS_CHUNK_CHARS = int(os.getenv("DOCS_CHUNK_CHARS", "1000"))
+DOCS_MAX_RESULT_CHARS = int(os.getenv("DOCS_MAX_RESULT_CHARS", "8000"))
+
+# Fetched pages and search results, persisted across server restarts
+page_cache = PageCache(
+    os.getenv("DOCS_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "docs.sqlite3")),
+    max_bytes=int(os.getenv("DOCS_CACHE_MAX_BYTES", str(200 * 1024 * 1024))),
+    search_ttl=float(os.getenv("SEARCH_CACHE_TTL", "86400")),
+)
+# Cached pages younger than this are served without revalidating
+DOCS_PAGE_FRESH_SECONDS = float(os.getenv("DOCS_PAGE_FRESH_SECONDS", "3600"))
 
 docs_urls = {
     "langchain": "python.langchain.com/docs",
@@ -20,34 +73,48 @@ docs_urls = {
 # ---------------- IGDB Setup ----------------
 TWITCH_CLIENT_ID = os.getenv("TWITCH_CLIENT_ID")
 TWITCH_CLIENT_SECRET = os.getenv("TWITCH_CLIENT_SECRET")
-IGDB_TOKEN_URL = "https://id.twitch.tv/oauth2/token"
-IGDB_GAMES_URL = "https://api.igdb.com/v4/games"
-
-igdb_access_token = None
-
-
-async def get_igdb_token():
-    global igdb_access_token
-    if igdb_access_token:
-        return igdb_access_token
-
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            IGDB_TOKEN_URL,
-            params={
-                "client_id": TWITCH_CLIENT_ID,
-                "client_secret": TWITCH_CLIENT_SECRET,
-                "grant_type": "client_credentials",
-            },
-            timeout=15,
-        )
-        response.raise_for_status()
-        igdb_access_token = response.json()["access_token"]
-        return igdb_access_token
+# Overridable so benchmarks can run against local stand-ins
+IGDB_TOKEN_URL = os.getenv("IGDB_TOKEN_URL", "https://id.twitch.tv/oauth2/token")
+IGDB_GAMES_URL = os.getenv("IGDB_GAMES_URL", "https://api.igdb.com/v4/games")
+IGDB_MULTIQUERY_URL = os.getenv("IGDB_MULTIQUERY_URL", "https://api.igdb.com/v4/multiquery")
+IGDB_FIELDS = "name,storyline,first_release_date,genres.name,rating,involved_companies.company.name,similar_games.name"
+# IGDB accepts at most 10 queries per multiquery request
+IGDB_MULTIQUERY_SIZE = 10
+# IGDB allows 4 requests per second and 8 open requests per client. The API runs
+# MCP_POOL_SIZE server processes against one quota, so each takes an equal share.
+MCP_POOL_SIZE = max(int(os.getenv("MCP_POOL_SIZE", "1")), 1)
+igdb_rate = RateLimiter(float(os.getenv("IGDB_REQUESTS_PER_SECOND", "4")) / MCP_POOL_SIZE)
+igdb_requests = asyncio.Semaphore(max(int(os.getenv("IGDB_MAX_OPEN_REQUESTS", "8")) // MCP_POOL_SIZE, 1))
+
+igdb_tokens = IGDBTokenManager(
+    TWITCH_CLIENT_ID,
+    TWITCH_CLIENT_SECRET,
+    IGDB_TOKEN_URL,
+    client=lambda: http_pool.client("twitch"),
+    refresh_margin=float(os.getenv("IGDB_TOKEN_REFRESH_MARGIN", "300")),
+)
+
+# IGDB results keyed by normalized game name
+game_cache = ResponseCache(
+    ttl=float(os.getenv("GAME_CACHE_TTL", "3600")),
+    stale_ttl=float(os.getenv("GAME_CACHE_STALE_TTL", "86400")),
+    max_entries=int(os.getenv("GAME_CACHE_MAX_ENTRIES", "5000")),
+)
+
+# Game records on disk, consulted before IGDB and filled in from it; seed with game_catalog.py
+game_catalog = GameCatalog(
+    default_path(),
+    min_similarity=float(os.getenv("GAME_CATALOG_MIN_SIMILARITY", "0.85")),
+    max_age=float(os.getenv("GAME_CATALOG_MAX_AGE", str(30 * 86400))),
+)
+
+
+def normalize_game_name(game_name: str) -> str:
+    return " ".join(game_name.lower().split())
 
 
 @mcp.tool()
-async def search_game_info(game_name: str):
+async def search_game_info(game_name: str, ctx: Context):
     """
     Get information about a video game from IGDB.
 
@@ -57,82 +124,206 @@ async def search_game_info(game_name: str):
     Returns:
         Summary of the game's information.
     """
-    token = await get_igdb_token()
-    headers = {
-        "Client-ID": TWITCH_CLIENT_ID,
-        "Authorization": f"Bearer {token}",
-    }
-    body = f'search "{game_name}"; fields name,storyline,first_release_date,genres.name,rating,involved_companies.company.name,similar_games.name; limit 1;'
-
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            IGDB_GAMES_URL,
-            data=body,
-            headers=headers,
-            timeout=15,
+    trace_id = trace_id_of(ctx)
+    with timings.span("search_game_info", trace_id):
+        return await game_cache.get_or_fetch(
+            normalize_game_name(game_name), lambda: lookup_game(game_name, trace_id)
         )
-        response.raise_for_status()
-        games = response.json()
-
-        if not games:
-            return "No game found."
 
-        game = games[0]
-        parts = [
-            f"🎮 **{game.get('name', 'Unknown')}**",
-            f"📅 Released: {game.get('first_release_date', 'N/A')}",
-        ]
 
-        if game.get("genres"):
-            genres = ", ".join([g["name"] for g in game["genres"]])
-            parts.append(f"🎭 Genres: {genres}")
+async def lookup_game(game_name: str, trace_id: str | None = None):
+    """The game's summary from the local catalog, or from IGDB (written back to the catalog)."""
+    with timings.span("catalog_lookup", trace_id):
+        game = await asyncio.to_thread(game_catalog.find, game_name)
+    if game is not None:
+        return format_game(game)
+
+    try:
+        game = await fetch_game_info(game_name, trace_id)
+    except Exception:
+        # An outdated record is more useful than an error
+        game = await asyncio.to_thread(game_catalog.find, game_name, True)
+        if game is None:
+            raise
+        logger.warning(f"IGDB lookup for {game_name!r} failed, serving the catalog's stale record")
+        return format_game(game)
+    if game is None:
+        return "No game found."
+    await asyncio.to_thread(game_catalog.put, game, "igdb", game_name)
+    return format_game(game)
+
+
+async def fetch_game_info(game_name: str, trace_id: str | None = None) -> dict | None:
+    body = f'search "{game_name}"; fields {IGDB_FIELDS}; limit 1;'
+
+    with timings.span("igdb_request", trace_id):
+        async with igdb_requests:
+            await igdb_rate.acquire()
+            response = await igdb_tokens.post(
+                IGDB_GAMES_URL,
+                http_pool.client("igdb"),
+                data=body,
+                timeout=15,
+            )
+    games = response.json()
+    return games[0] if games else None
+
+
+def format_game(game: dict) -> str:
+    parts = [
+        f"🎮 **{game.get('name', 'Unknown')}**",
+        f"📅 Released: {game.get('first_release_date', 'N/A')}",
+    ]
+
+    if game.get("genres"):
+        genres = ", ".join([g["name"] for g in game["genres"]])
+        parts.append(f"🎭 Genres: {genres}")
+
+    if game.get("involved_companies"):
+        companies = ", ".join([c["company"]["name"] for c in game["involved_companies"]])
+        parts.append(f"🏢 Developers: {companies}")
+
+    if game.get("rating"):
+        parts.append(f"⭐ Rating: {round(game['rating'], 1)}")
+
+    if game.get("storyline"):
+        parts.append(f"\n📝 Storyline: {game['storyline']}")
+    
+    if game.get("similar_games"):
+        similar_games = ", ".join([sg["name"] for sg in game["similar_games"][:3]])
+        parts.append(f"\n🔗 Similar Games: {similar_games}")
+
+    return "\n".join(parts)
 
-        if game.get("involved_companies"):
-            companies = ", ".join([c["company"]["name"] for c in game["involved_companies"]])
-            parts.append(f"🏢 Developers: {companies}")
 
-        if game.get("rating"):
-            parts.append(f"⭐ Rating: {round(game['rating'], 1)}")
+@mcp.tool()
+async def search_games_batch(game_names: list[str], ctx: Context):
+    """
+    Get information about several video games from IGDB at once.
 
-        if game.get("storyline"):
-            parts.append(f"\n📝 Storyline: {game['storyline']}")
-        
-        if game.get("similar_games"):
-            similar_games = ", ".join([sg["name"] for sg in game["similar_games"][:3]])
-            parts.append(f"\n🔗 Similar Games: {similar_games}")
+    Args:
+        game_names: The names of the games to search for.
 
-        return "\n".join(parts)
+    Returns:
+        JSON object mapping each requested name to its summary.
+    """
+    trace_id = trace_id_of(ctx)
+    with timings.span("search_games_batch", trace_id):
+        keys = {name: normalize_game_name(name) for name in game_names}
+        summaries, missing = {}, []
+        for key in dict.fromkeys(keys.values()):
+            cached = game_cache.peek(key)
+            if cached is None:
+                missing.append(key)
+            else:
+                summaries[key] = cached
+
+        with timings.span("catalog_lookup", trace_id):
+            known = await asyncio.to_thread(lambda: {key: game_catalog.find(key) for key in missing})
+        unknown = [key for key in missing if known[key] is None]
+
+        chunks = [unknown[i : i + IGDB_MULTIQUERY_SIZE] for i in range(0, len(unknown), IGDB_MULTIQUERY_SIZE)]
+        with timings.span("igdb_multiquery", trace_id):
+            for fetched in await asyncio.gather(*(fetch_games_multiquery(chunk) for chunk in chunks)):
+                known.update(fetched)
+        found = [key for key in unknown if known[key] is not None]
+        if found:
+            await asyncio.to_thread(
+                game_catalog.put_many, [known[key] for key in found], "igdb", dict(enumerate(found))
+            )
+        for key in missing:
+            summaries[key] = format_game(known[key]) if known[key] is not None else "No game found."
+            game_cache.put(key, summaries[key])
+        return json.dumps({name: summaries[key] for name, key in keys.items()})
+
+
+async def fetch_games_multiquery(keys: list[str]) -> dict:
+    """Look up to IGDB_MULTIQUERY_SIZE games in one request; unknown names map to None."""
+    queries = []
+    for i, key in enumerate(keys):
+        search = key.replace('"', "")
+        queries.append(f'query games "{i}" {{ search "{search}"; fields {IGDB_FIELDS}; limit 1; }};')
+    body = "\n".join(queries)
+    async with igdb_requests:
+        await igdb_rate.acquire()
+        response = await igdb_tokens.post(
+            IGDB_MULTIQUERY_URL,
+            http_pool.client("igdb"),
+            data=body,
+            timeout=15,
+        )
+    results = {item["name"]: item.get("result") for item in response.json()}
+    return {key: results[str(i)][0] if results.get(str(i)) else None for i, key in enumerate(keys)}
 
 # ------------- Existing Tools -------------
 
 async def search_web(query: str) -> dict | None:
+    cached = await asyncio.to_thread(page_cache.get_search, query)
+    if cached is not None:
+        return cached
+
     payload = json.dumps({"q": query, "num": 2})
     headers = {
         "X-API-KEY": os.getenv("SERPER_API_KEY"),
         "Content-Type": "application/json",
     }
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(SERPER_URL, headers=headers, data=payload, timeout=30.0)
-            response.raise_for_status()
-            return response.json()
-        except httpx.TimeoutException:
-            return {"organic": []}
+    try:
+        response = await http_pool.client("serper").post(SERPER_URL, headers=headers, data=payload, timeout=30.0)
+        response.raise_for_status()
+        results = response.json()
+        if results.get("organic"):
+            await asyncio.to_thread(page_cache.put_search, query, results)
+        return results
+    except httpx.TimeoutException:
+        return {"organic": []}
 
 
 async def fetch_url(url: str):
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(url, timeout=30.0)
-            soup = BeautifulSoup(response.text, "html.parser")
-            text = soup.get_text()
-            return text
-        except httpx.TimeoutException:
-            return "Timeout error"
+    cached = await asyncio.to_thread(page_cache.get_page, url)
+    if cached is not None and time.time() - cached.fetched_at < DOCS_PAGE_FRESH_SECONDS:
+        await asyncio.to_thread(page_cache.touch_page, url)
+        return cached.text
+
+    # Revalidate what we have instead of downloading and parsing it again
+    headers = {}
+    if cached is not None and cached.etag:
+        headers["If-None-Match"] = cached.etag
+    if cached is not None and cached.last_modified:
+        headers["If-Modified-Since"] = cached.last_modified
+
+    try:
+        # Stream the body and stop reading once we have enough of the page
+        body = bytearray()
+        async with http_pool.client("docs").stream(
+            "GET", url, headers=headers, timeout=30.0, follow_redirects=True
+        ) as response:
+            if response.status_code == 304 and cached is not None:
+                await asyncio.to_thread(page_cache.touch_page, url, True)
+                return cached.text
+            async for data in response.aiter_bytes():
+                body += data
+                if len(body) >= DOCS_MAX_PAGE_BYTES:
+                    break
+            html = bytes(body[:DOCS_MAX_PAGE_BYTES]).decode(response.encoding or "utf-8", errors="replace")
+        # Parsing is CPU-bound, keep it off the event loop
+        text = await asyncio.to_thread(extract_main_text, html)
+        if response.status_code == 200:
+            await asyncio.to_thread(
+                page_cache.put_page,
+                url,
+                response.headers.get("etag"),
+                response.headers.get("last-modified"),
+                html,
+                text,
+            )
+        return text
+    except httpx.TimeoutException:
+        # A stale copy is more useful than nothing
+        return cached.text if cached is not None else "Timeout error"
 
 
 @mcp.tool()
-async def get_docs(query: str, library: str):
+async def get_docs(query: str, library: str, ctx: Context):
     """  Search the latest docs for a given query and library.
   Supports langchain, openai, and llama-index.
 
@@ -145,15 +336,52 @@ async def get_docs(query: str, library: str):
     if library not in docs_urls:
         raise ValueError(f"Library {library} not supported by this tool")
 
-    query = f"site:{docs_urls[library]} {query}"
-    results = await search_web(query)
-    if len(results["organic"]) == 0:
-        return "No results found"
-
-    text = ""
-    for result in results["organic"]:
-        text += await fetch_url(result["link"])
-    return text
+    trace_id = trace_id_of(ctx)
+    with timings.span("get_docs", trace_id):
+        with timings.span("docs_search", trace_id):
+            results = await search_web(f"site:{docs_urls[library]} {query}")
+        if len(results["organic"]) == 0:
+            return "No results found"
+
+        links = [result["link"] for result in results["organic"]]
+        with timings.span("docs_fetch", trace_id):
+            pages = await asyncio.gather(*(fetch_url(link) for link in links), return_exceptions=True)
+        for i, (link, page) in enumerate(zip(links, pages)):
+            if isinstance(page, Exception):
+                # One unreadable page shouldn't sink the others
+                logger.warning(f"Skipping {link}: {page!r}")
+                pages[i] = ""
+        with timings.span("docs_rank", trace_id):
+            chunks = [
+                chunk
+                for link, page in zip(links, pages)
+                for chunk in split_chunks(page, source=link, chunk_chars=DOCS_CHUNK_CHARS)
+            ]
+            return rank_chunks(chunks, query, max_chars=DOCS_MAX_RESULT_CHARS) or "No results found"
+
+
+@mcp.resource("stats://http-pool")
+def http_pool_stats() -> str:
+    """Request and connection-reuse counters for each upstream HTTP client."""
+    return json.dumps(http_pool.snapshot())
+
+
+@mcp.resource("stats://game-cache")
+def game_cache_stats() -> str:
+    """Hit, miss and single-flight counters for the search_game_info cache."""
+    return json.dumps(game_cache.snapshot())
+
+
+@mcp.resource("stats://game-catalog")
+def game_catalog_stats() -> str:
+    """Record counts and exact, alias and fuzzy hit counters for the local game catalog."""
+    return json.dumps(game_catalog.snapshot())
+
+
+@mcp.resource("stats://timings")
+def span_timings() -> str:
+    """Latency histograms for every tool call and its stages."""
+    return json.dumps(timings.snapshot())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,127 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Optional
+
+logger = logging.getLogger("docs-server")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    html BLOB,
+    text TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    fetched_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pages_accessed_at ON pages (accessed_at);
+CREATE TABLE IF NOT EXISTS searches (
+    query TEXT PRIMARY KEY,
+    response TEXT NOT NULL,
+    stored_at REAL NOT NULL
+);
+"""
+
+
+@dataclass
+class CachedPage:
+    url: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    text: str
+    fetched_at: float
+
+
+class PageCache:
+    """
+    SQLite-backed cache for get_docs, shared across restarts of the server process.
+
+    Pages are stored as zlib-compressed raw HTML plus their extracted text and HTTP
+    validators (ETag / Last-Modified), so stale pages can be revalidated with a
+    conditional GET and served without re-parsing on a 304. Serper search responses
+    are cached with a TTL. Least recently used pages are evicted once the stored
+    size passes `max_bytes`.
+
+    All methods are blocking; call them through `asyncio.to_thread`.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 200 * 1024 * 1024, search_ttl: float = 86400):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.search_ttl = search_ttl
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+
+    def get_page(self, url: str) -> Optional[CachedPage]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT etag, last_modified, text, fetched_at FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return CachedPage(url, row[0], row[1], row[2], row[3])
+
+    def touch_page(self, url: str, revalidated: bool = False):
+        now = time.time()
+        with self._lock, self._db:
+            if revalidated:
+                self._db.execute(
+                    "UPDATE pages SET accessed_at = ?, fetched_at = ? WHERE url = ?", (now, now, url)
+                )
+            else:
+                self._db.execute("UPDATE pages SET accessed_at = ? WHERE url = ?", (now, url))
+
+    def put_page(self, url: str, etag: Optional[str], last_modified: Optional[str], html: str, text: str):
+        compressed = zlib.compress(html.encode("utf-8", errors="replace"))
+        size = len(compressed) + len(text.encode("utf-8", errors="replace"))
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, compressed, text, size, now, now),
+            )
+            self._evict()
+
+    def _evict(self):
+        (total,) = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        for url, size in self._db.execute("SELECT url, size FROM pages ORDER BY accessed_at").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM pages WHERE url = ?", (url,))
+            total -= size
+            evicted += 1
+        logger.info(f"Evicted {evicted} pages from the docs cache")
+
+    def get_search(self, query: str) -> Optional[dict]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT response, stored_at FROM searches WHERE query = ?", (query,)
+            ).fetchone()
+        if row is None or time.time() - row[1] > self.search_ttl:
+            return None
+        return json.loads(row[0])
+
+    def put_search(self, query: str, response: dict):
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO searches VALUES (?, ?, ?)",
+                (query, json.dumps(response), time.time()),
+            )
+            self._db.execute("DELETE FROM searches WHERE stored_at < ?", (time.time() - self.search_ttl,))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
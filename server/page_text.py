@@ -0,0 +1,123 @@
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import List
+
+try:
+    import lxml.etree
+    import lxml.html
+
+    LXML_AVAILABLE = True
+except ImportError:
+    from bs4 import BeautifulSoup
+
+    LXML_AVAILABLE = False
+
+# Page furniture that never carries documentation content
+BOILERPLATE_TAGS = ["script", "style", "noscript", "nav", "header", "footer", "aside", "form", "svg", "button"]
+# Elements that end a line of text
+BLOCK_TAGS = {"p", "div", "section", "li", "pre", "table", "tr", "br", "h1", "h2", "h3", "h4", "h5", "h6", "dt", "dd"}
+
+_TOKEN = re.compile(r"[a-z0-9_]+")
+# lxml refuses str input that carries an encoding declaration (XHTML pages)
+_XML_DECLARATION = re.compile(r"^\s*<\?xml[^>]*\?>", re.IGNORECASE)
+
+
+@dataclass
+class Chunk:
+    source: str
+    text: str
+    score: float = 0.0
+
+
+def extract_main_text(html: str) -> str:
+    """Visible text of a page's main content area, one paragraph per line."""
+    if not html:
+        return ""
+    if LXML_AVAILABLE:
+        try:
+            tree = lxml.html.fromstring(_XML_DECLARATION.sub("", html, count=1))
+        except (lxml.etree.ParserError, ValueError):
+            # Whitespace- or comment-only bodies: "Document is empty"
+            return ""
+        for element in tree.xpath(" | ".join(f"//{tag}" for tag in BOILERPLATE_TAGS)):
+            element.drop_tree()
+        main = tree.xpath("//main | //article | //*[@role='main']")
+        root = main[0] if main else (tree.find("body") if tree.find("body") is not None else tree)
+        for element in root.iter(*BLOCK_TAGS):
+            element.tail = "\n" + (element.tail or "")
+        text = root.text_content()
+    else:
+        soup = BeautifulSoup(html, "html.parser")
+        for element in soup(BOILERPLATE_TAGS):
+            element.decompose()
+        root = soup.find("main") or soup.find("article") or soup.body or soup
+        text = root.get_text("\n")
+
+    lines = (" ".join(line.split()) for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def split_chunks(text: str, source: str, chunk_chars: int = 1000) -> List[Chunk]:
+    """Group consecutive lines into chunks of roughly `chunk_chars` characters."""
+    chunks, current, size = [], [], 0
+    for line in text.splitlines():
+        if size + len(line) > chunk_chars and current:
+            chunks.append(Chunk(source, "\n".join(current)))
+            current, size = [], 0
+        current.append(line[:chunk_chars])
+        size += len(line) + 1
+    if current:
+        chunks.append(Chunk(source, "\n".join(current)))
+    return chunks
+
+
+def _tokens(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+
+def rank_chunks(chunks: List[Chunk], query: str, max_chars: int = 8000) -> str:
+    """
+    Score chunks against the query with BM25 and return the best ones that fit in
+    `max_chars`, in their original page order.
+    """
+    query_terms = set(_tokens(query))
+    if not chunks:
+        return ""
+
+    tokenized = [_tokens(chunk.text) for chunk in chunks]
+    avg_len = sum(len(tokens) for tokens in tokenized) / len(tokenized) or 1.0
+    doc_freq = Counter(term for tokens in tokenized for term in set(tokens) & query_terms)
+    k1, b = 1.5, 0.75
+    for chunk, tokens in zip(chunks, tokenized):
+        counts = Counter(tokens)
+        score = 0.0
+        for term in query_terms:
+            tf = counts.get(term, 0)
+            if not tf:
+                continue
+            idf = math.log(1 + (len(chunks) - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5))
+            score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len(tokens) / avg_len))
+        chunk.score = score
+
+    # Only fall back to unmatched chunks when nothing matched the query at all
+    any_match = any(chunk.score > 0 for chunk in chunks)
+    selected, used = [], 0
+    for index in sorted(range(len(chunks)), key=lambda i: chunks[i].score, reverse=True):
+        chunk = chunks[index]
+        if any_match and chunk.score == 0:
+            break
+        if used + len(chunk.text) > max_chars:
+            continue
+        selected.append(index)
+        used += len(chunk.text)
+
+    parts, last_source = [], None
+    for index in sorted(selected):
+        chunk = chunks[index]
+        if chunk.source != last_source:
+            parts.append(f"Source: {chunk.source}")
+            last_source = chunk.source
+        parts.append(chunk.text)
+    return "\n\n".join(parts)
@@ -0,0 +1,23 @@
+import asyncio
+import time
+
+
+class RateLimiter:
+    """
+    Spaces calls at least `1 / rate` seconds apart, in the order they arrive.
+
+    The limit is per process: when several server processes share one upstream
+    quota, give each its share of the rate.
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate if rate > 0 else 0.0
+        self._next = 0.0
+
+    async def acquire(self):
+        # No await between reading and advancing _next, so concurrent callers get distinct slots
+        now = time.monotonic()
+        slot = max(now, self._next)
+        self._next = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
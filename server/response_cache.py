@@ -0,0 +1,106 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict
+
+logger = logging.getLogger("docs-server")
+
+
+@dataclass
+class _Entry:
+    value: Any
+    stored_at: float
+
+
+class ResponseCache:
+    """
+    Size-bounded TTL cache for tool results, with stale-while-revalidate and single-flight.
+
+    Fresh entries are served directly. Entries past `ttl` but within `stale_ttl` are
+    still served while one background refresh runs. Concurrent misses for the same
+    key share a single upstream fetch instead of each making their own.
+    """
+
+    def __init__(self, ttl: float = 3600, stale_ttl: float = 86400, max_entries: int = 1000):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    async def get_or_fetch(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry.stored_at
+            if age < self.ttl:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry.value
+            if age < self.ttl + self.stale_ttl:
+                self.stale_hits += 1
+                self._entries.move_to_end(key)
+                self._start_fetch(key, fetch)
+                return entry.value
+
+        self.misses += 1
+        # shield: one waiter being cancelled must not cancel the fetch the others share
+        return await asyncio.shield(self._start_fetch(key, fetch))
+
+    def peek(self, key: str) -> Any:
+        """The fresh cached value for `key`, or None. Never fetches."""
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry.stored_at >= self.ttl:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry.value
+
+    def put(self, key: str, value: Any):
+        """Store a value fetched outside `get_or_fetch`, e.g. as part of a batch."""
+        self._store(key, value)
+
+    def _start_fetch(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return task
+
+        async def run():
+            try:
+                value = await fetch()
+                self._store(key, value)
+                return value
+            finally:
+                self._inflight.pop(key, None)
+
+        task = asyncio.create_task(run())
+        task.add_done_callback(self._log_background_failure)
+        self._inflight[key] = task
+        return task
+
+    def _log_background_failure(self, task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Cache refresh failed: {task.exception()}")
+
+    def _store(self, key: str, value: Any):
+        self._entries[key] = _Entry(value, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def snapshot(self):
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "inflight": len(self._inflight),
+        }
@@ -0,0 +1,64 @@
+import logging
+import os
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+logger = logging.getLogger("docs-server")
+
+# Upper bounds in seconds, shared with the API so the histograms can be merged
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Share of traces whose spans are logged; the same variable sets the API's sampling
+TRACE_LOG_SAMPLE_RATE = float(os.getenv("TRACE_LOG_SAMPLE_RATE", "0.05"))
+
+
+def sampled(trace_id: Optional[str], rate: float = TRACE_LOG_SAMPLE_RATE) -> bool:
+    """Whether to log this trace. Decided by the id, so every span of a trace (in every
+    server process) is either logged or not."""
+    if not trace_id:
+        return False
+    return zlib.crc32(trace_id.encode()) / 0xFFFFFFFF < rate
+
+
+class SpanTimings:
+    """
+    Latency histograms for named spans (tool calls and their stages).
+
+    `snapshot` returns per-bucket counts so the API can merge the numbers from every
+    server process in its pool and export them on /metrics.
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        self._spans: Dict[str, Dict] = {}
+
+    def observe(self, name: str, seconds: float):
+        span = self._spans.get(name)
+        if span is None:
+            span = self._spans[name] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+        index = next((i for i, bound in enumerate(self.buckets) if seconds <= bound), len(self.buckets))
+        span["counts"][index] += 1
+        span["sum"] += seconds
+        span["count"] += 1
+
+    @contextmanager
+    def span(self, name: str, trace_id: Optional[str] = None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.observe(name, elapsed)
+            if sampled(trace_id):
+                logger.info(f"[{trace_id}] {name} took {elapsed * 1000:.1f}ms")
+
+    def snapshot(self) -> Dict[str, object]:
+        return {"buckets": list(self.buckets), "spans": self._spans}
+
+
+def trace_id_of(ctx) -> Optional[str]:
+    """Trace id the API sent in the request's `_meta`, if any."""
+    meta = ctx.request_context.meta if ctx is not None else None
+    return getattr(meta, "trace_id", None)